@@ -16,5 +16,6 @@
 # You should have received a copy of the GNU Affero General Public        #
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
-from .table import Table
+from .table import Table, Workbook
 from exportable.table import DeclaredTable
+from exportable.statistics import StatisticsTable
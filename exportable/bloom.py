@@ -0,0 +1,84 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+Bloom filters test whether values were seen before, using a fixed amount of memory.
+"""
+import hashlib
+import math
+import pickle
+
+
+def encode(value) -> bytes:
+    """Encode value as bytes, such that equal tuples of equal values encode equally. pickle
+    memoizes objects occurring more than once, so ("ab", "ab") would pickle differently depending
+    on whether it holds the same string object twice. Tuples are therefore encoded by pickling
+    each element separately."""
+    if type(value) is not tuple:
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    # Pickles start with a PROTO opcode, so the tuple marker cannot be confused with a pickle
+    parts = [b"("]
+    for element in value:
+        element = encode(element)
+        parts.append(len(element).to_bytes(8, "little"))
+        parts.append(element)
+    return b"".join(parts)
+
+
+class BloomFilter(object):
+    """Set membership test using a fixed amount of memory. Might report values as present which
+    were never added (with probability error_rate, as long as no more than capacity values are
+    added), but never the other way around.
+
+    Values are hashed by a digest of their pickle instead of hash(), which maps some distinct
+    values (such as -1 and -2) to the same hash. Values must therefore be picklable, and values
+    comparing equal but pickling differently (such as 1 and 1.0) are considered different. Tuples
+    are pickled element by element (see encode())."""
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        @param capacity: number of values expected to be added
+        @param error_rate: false positive rate at capacity
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate should be between 0 and 1, not {}".format(error_rate))
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / max(1, capacity) * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _indices(self, value):
+        # Double hashing: derive all indices from two 64 bit hashes taken from a single digest
+        digest = hashlib.blake2b(encode(value), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, value) -> bool:
+        """Add value, and return whether it (probably) was present already"""
+        bits = self.bits
+        present = True
+        for index in self._indices(value):
+            byte, mask = index >> 3, 1 << (index & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                present = False
+        return present
+
+    def __contains__(self, value):
+        bits = self.bits
+        return all(bits[index >> 3] & (1 << (index & 7)) for index in self._indices(value))
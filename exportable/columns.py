@@ -16,14 +16,94 @@
 # You should have received a copy of the GNU Affero General Public        #
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
+import collections
+import copy
+import functools
 import itertools
 import datetime
+import sys
 import uuid
 
 import dateutil.parser
 
 CREATION_COUNTER = itertools.count()
 
+# Formats tried (after ISO 8601) before falling back to dateutil. These should only contain formats
+# dateutil would interpret in the same way, so no ambiguous day-first formats.
+DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y",
+    "%d-%b-%Y-%H:%M:%S",  # Format used by SPSS/PSPP
+)
+
+
+def strptime(fmt, s):
+    return datetime.datetime.strptime(s, fmt)
+
+
+class DateTimeParser(object):
+    """
+    Parses strings to datetimes. Instead of calling dateutil for every value, it tries
+    datetime.fromisoformat and a few fixed formats first. The first method that succeeds is
+    remembered and tried first for the next value, as values in a column tend to be formatted
+    the same way. Odd values still fall back to dateutil.
+    """
+    def __init__(self, formats=DATETIME_FORMATS, cache_size=0):
+        """
+        @param formats: strptime formats to try before falling back to dateutil
+        @param cache_size: if non-zero, memoize the results of this many (most recently used)
+                           strings. Useful for columns with many repeated values.
+        """
+        self.formats = formats
+        self.methods = [datetime.datetime.fromisoformat]
+        self.methods.extend(functools.partial(strptime, fmt) for fmt in formats)
+        self.learned = None
+
+        # An OrderedDict instead of functools.lru_cache, so parsers (and columns) can be pickled
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+
+    def __copy__(self):
+        # Copies of columns get their own cache and learned format
+        return self.__class__(self.formats, self.cache_size)
+
+    def parse(self, s: str) -> datetime.datetime:
+        if not self.cache_size:
+            return self._parse(s)
+
+        cache = self.cache
+        try:
+            value = cache[s]
+        except KeyError:
+            value = cache[s] = self._parse(s)
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(s)
+        return value
+
+    def _parse(self, s: str) -> datetime.datetime:
+        learned = self.learned
+        if learned is not None:
+            try:
+                return learned(s)
+            except ValueError:
+                pass
+
+        for method in self.methods:
+            if method is not learned:
+                try:
+                    value = method(s)
+                except ValueError:
+                    continue
+                self.learned = method
+                return value
+
+        return dateutil.parser.parse(s)
+
 
 class Column(object):
     def __init__(self, ctype, label=None, cellfunc=None, rowfunc=None, verbose_name=None, _creation_counter=None):
@@ -58,6 +138,21 @@ class Column(object):
         format does not support types or specific types."""
         return "" if value is None else str(value)
 
+    def to_str_many(self, values) -> list:
+        """Convert a batch of values of this column using to_str(). None values are kept as None.
+        Subclasses might specialize this for their type; the result should be equal to calling
+        to_str() on each non-None value."""
+        # Numeric NumPy arrays are converted all at once. If numpy was not imported by anyone,
+        # values cannot be an array.
+        numpy = sys.modules.get("numpy")
+        if numpy is not None and isinstance(values, numpy.ndarray) and values.dtype.kind in "biuf":
+            if type(self).to_str is Column.to_str:
+                return values.astype(str).tolist()
+            values = values.tolist()
+
+        to_str = str if type(self).to_str is Column.to_str else self.to_str
+        return [None if value is None else to_str(value) for value in values]
+
     def __copy__(self):
         # Copy be instantiating a new class
         copied = self.__class__(
@@ -66,10 +161,8 @@ class Column(object):
             _creation_counter=self._creation_counter
         )
 
-        # Copy all remaining attributes as well
-        for attr_name, value in self.__dict__.items():
-            if attr_name not in copied.__dict__:
-                copied.__dict__[attr_name] = value
+        # Copy all attributes as well, including those set by subclasses' constructors
+        copied.__dict__.update(self.__dict__)
 
         return copied
 
@@ -79,12 +172,22 @@ class Column(object):
 
 
 class TextColumn(Column):
-    def __init__(self, label=None, **kwargs):
+    def __init__(self, label=None, max_length=None, **kwargs):
+        """
+        @param max_length: maximum number of characters of values in this column, if known. Used
+                           by exporters which need to declare the width of text fields.
+        """
         super().__init__(str, label, **kwargs)
+        self.max_length = max_length
 
     def to_str(self, value):
         return value
 
+    def to_str_many(self, values) -> list:
+        if type(self).to_str is not TextColumn.to_str:
+            return super().to_str_many(values)
+        return list(values)
+
 
 class UUIDColumn(Column):
     def __init__(self, label=None, **kwargs):
@@ -108,26 +211,65 @@ class FloatColumn(Column):
 
 
 class DateColumn(Column):
-    def __init__(self, label=None, **kwargs):
+    def __init__(self, label=None, cache_size=0, **kwargs):
+        """
+        @param cache_size: number of parsed strings to memoize in from_str()
+        """
         super().__init__(datetime.date, label, **kwargs)
+        self.parser = DateTimeParser(cache_size=cache_size)
+
+    def __copy__(self):
+        copied = super().__copy__()
+        copied.parser = copy.copy(self.parser)
+        return copied
 
     def from_str(self, s) -> datetime.date:
-        return dateutil.parser.parse(s).date() if s else None
+        return self.parser.parse(s).date() if s else None
 
     def to_str(self, date: datetime.date):
         return date.isoformat()
 
+    def to_str_many(self, values) -> list:
+        # Dates tend to repeat, so only format each distinct date once
+        formatted = {None: None}
+        result = []
+        for value in values:
+            try:
+                result.append(formatted[value])
+            except KeyError:
+                result.append(formatted.setdefault(value, self.to_str(value)))
+        return result
+
 
 class DateTimeColumn(Column):
-    def __init__(self, label=None, **kwargs):
+    def __init__(self, label=None, cache_size=0, **kwargs):
+        """
+        @param cache_size: number of parsed strings to memoize in from_str()
+        """
         super().__init__(datetime.datetime, label, **kwargs)
+        self.parser = DateTimeParser(cache_size=cache_size)
+
+    def __copy__(self):
+        copied = super().__copy__()
+        copied.parser = copy.copy(self.parser)
+        return copied
 
     def from_str(self, s) -> datetime.datetime:
-        return dateutil.parser.parse(s) if s else None
+        return self.parser.parse(s) if s else None
 
     def to_str(self, time: datetime.datetime):
         return time.isoformat()
 
+    def to_str_many(self, values) -> list:
+        if type(self).to_str is not DateTimeColumn.to_str:
+            return super().to_str_many(values)
+        # The unbound method skips an attribute lookup, but only accepts datetimes (not dates)
+        isoformat = datetime.datetime.isoformat
+        return [
+            None if value is None else isoformat(value) if type(value) is datetime.datetime else value.isoformat()
+            for value in values
+        ]
+
 
 class BooleanField(Column):
     def __init__(self, label=None, **kwargs):
@@ -0,0 +1,154 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+Generates specialized functions processing a whole row at once. Instead of looping over columns
+(and their converters) for every row, the generated functions contain straight-line code for
+each column, with all functions they call bound to closure variables.
+
+Code only depends on the shape of a schema (the number of columns, and which of them need a
+cellfunc or converter), so it is generated once per shape and shared by all tables and exports
+with that shape. The functions and labels of a particular schema are bound by calling the cached
+factory, which is cheap, and the cache never holds on to them.
+
+>>> convert = get_row_converter((None, str))
+>>> convert([1, 2])
+[1, '2']
+"""
+import functools
+
+CACHE_SIZE = 256
+
+
+def compile_factory(name, params, body):
+    """
+    Compile a factory returning function name(row) with given body (list of lines). The factory
+    takes params, the names of the functions and constants used by body.
+    """
+    lines = ["def make({}):".format(", ".join(params)), "    def {}(row):".format(name)]
+    lines.extend("        " + line for line in body)
+    lines.append("    return {}".format(name))
+    source = "\n".join(lines) + "\n"
+
+    namespace = {}
+    exec(compile(source, "<exportable.compiler.{}>".format(name), "exec"), namespace)
+    factory = namespace["make"]
+    factory.source = source
+    return factory
+
+
+def unpack(n):
+    """Return a line unpacking argument 'row' into local variables v0..vn"""
+    if not n:
+        return "pass"
+    return "({},) = row".format(", ".join("v{}".format(i) for i in range(n)))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def row_getter_factory(cellfuncs):
+    """
+    @param cellfuncs: tuple of booleans indicating whether each column has a cellfunc
+    @return: factory taking the rowfunc (and cellfunc, if any) of each column
+    """
+    params, values = [], []
+    for i, has_cellfunc in enumerate(cellfuncs):
+        params.append("r{}".format(i))
+        value = "r{}(row)".format(i)
+        if has_cellfunc:
+            params.append("c{}".format(i))
+            value = "c{}({})".format(i, value)
+        values.append(value)
+    return compile_factory("get_row", params, ["return [{}]".format(", ".join(values))])
+
+
+def get_row_getter(fields):
+    """
+    Return a function extracting a list of values from a row, equivalent to calling Table.get_value
+    for each column.
+
+    @param fields: tuple of (rowfunc, cellfunc) for each column. cellfunc may be None.
+    """
+    functions = [function for field in fields for function in field if function is not None]
+    return row_getter_factory(tuple(cellfunc is not None for _, cellfunc in fields))(*functions)
+
+
+def convert_values(converters, null="None"):
+    """Return parameters and an expression for each (converted) value. None values are replaced
+    by null, another expression.
+
+    @param converters: tuple of booleans indicating whether each value needs conversion
+    """
+    params, values = [], []
+    for i, has_converter in enumerate(converters):
+        if not has_converter:
+            values.append("v{}".format(i) if null == "None" else "{1} if v{0} is None else v{0}".format(i, null))
+        else:
+            params.append("s{}".format(i))
+            values.append("{1} if v{0} is None else s{0}(v{0})".format(i, null))
+    return params, values
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def row_converter_factory(converters, dicts=False):
+    """
+    @param converters: tuple of booleans indicating whether each value needs conversion
+    @param dicts: return dicts instead of lists
+    @return: factory taking the converters (which are not None) followed by labels, if dicts
+    """
+    params, values = convert_values(converters)
+    if not dicts:
+        result = "[{}]".format(", ".join(values))
+    else:
+        params.extend("l{}".format(i) for i in range(len(values)))
+        result = "{{{}}}".format(", ".join("l{}: {}".format(i, value) for i, value in enumerate(values)))
+    return compile_factory("convert_row", params, [unpack(len(converters)), "return " + result])
+
+
+def get_row_converter(converters, labels=None):
+    """
+    Return a function converting the values of a row. None values are never converted.
+
+    @param converters: sequence of functions (or None if no conversion is needed) for each column
+    @param labels: if given, return dicts with these keys instead of lists
+    """
+    factory = row_converter_factory(tuple(c is not None for c in converters), labels is not None)
+    return factory(*[c for c in converters if c is not None], *(labels or ()))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def row_formatter_factory(serializers):
+    """
+    @param serializers: tuple of booleans indicating whether each value needs to be serialized
+    @return: factory taking the serializers (which are not None), separator and terminator
+    """
+    params, values = convert_values(serializers, null='""')
+    params.extend(("separator", "terminator"))
+    parts = ["({})".format(value) for value in values]
+    body = "separator.join(({},))".format(", ".join(parts)) if parts else '""'
+    return compile_factory("format_row", params, [unpack(len(serializers)), "return {} + terminator".format(body)])
+
+
+def get_row_formatter(serializers, separator, terminator="\n"):
+    """
+    Return a function formatting a row as a line of text. Serializers should return strings; None
+    values are formatted as empty strings.
+
+    @param serializers: sequence of functions (or None for values which are strings already)
+    """
+    factory = row_formatter_factory(tuple(s is not None for s in serializers))
+    return factory(*[s for s in serializers if s is not None], separator, terminator)
@@ -17,18 +17,28 @@
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
 from exportable.exporters.base import Exporter
-from exportable.exporters.csv import CSVExporter
-from exportable.exporters.pyexcel import ODSExporter, XLSXExporter, XLSExporter
+from exportable.exporters.csv import CSVExporter, TSVExporter
+from exportable.exporters.pyexcel import XLSExporter
+from exportable.exporters.ods import ODSExporter
+from exportable.exporters.xlsx import XLSXExporter
 from exportable.exporters.spss import SPSSExporter
-from exportable.exporters.json import JSONExporter
+from exportable.exporters.json import JSONExporter, NDJSONExporter
+from exportable.exporters.parquet import ParquetExporter
+from exportable.exporters.sqlite import SQLiteExporter
+from exportable.exporters.msgpack import MessagePackExporter
 
 DEFAULT_EXPORTERS = [
     JSONExporter,
+    NDJSONExporter,
     ODSExporter,
     XLSXExporter,
     XLSExporter,
     CSVExporter,
-    SPSSExporter
+    TSVExporter,
+    SPSSExporter,
+    ParquetExporter,
+    SQLiteExporter,
+    MessagePackExporter
 ]
 
 
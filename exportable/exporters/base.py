@@ -17,11 +17,33 @@
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
 import io
+import codecs
 import concurrent.futures
 from contextlib import ContextDecorator
 from gzip import GzipFile
 from queue import Queue, Empty
 
+from exportable.table import Workbook
+
+
+def encode(text: str, encoding: str, initial=True) -> bytes:
+    """Encode text. If initial is False, text is assumed to continue an earlier written stream,
+    so no byte order mark is written for encodings which use one (such as UTF-16)."""
+    if initial:
+        return text.encode(encoding)
+    encoder = codecs.getincrementalencoder(encoding)()
+    encoder.encode("")
+    return encoder.encode(text, True)
+
+
+def convert_batch(converters, rows) -> list:
+    """Convert a batch of rows column-wise. Converters are functions taking all values of a column
+    (such as Column.to_str_many) or None for columns which need no conversion."""
+    if not any(converters) or not rows:
+        return rows
+    columns = [values if convert is None else convert(values) for convert, values in zip(converters, zip(*rows))]
+    return list(zip(*columns))
+
 
 class QueueWriter(ContextDecorator):
     def __init__(self, queue: Queue):
@@ -32,6 +54,28 @@ class QueueWriter(ContextDecorator):
             self.queue.put(b)
 
 
+class StreamWriter(object):
+    """Wraps a file like object which might only support write(), and keeps track of the number of
+    bytes written. Libraries such as zipfile (and pyarrow) need tell(), flush() or closed to write
+    to unseekable streams, such as QueueWriter."""
+    closed = False
+
+    def __init__(self, fo):
+        self.fo = fo
+        self.offset = 0
+
+    def write(self, b):
+        self.fo.write(b)
+        self.offset += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+
 class CompressingQueueWriter():
     def __init__(self, queue: Queue, compress_level=3):
         self.queue = queue
@@ -52,6 +96,14 @@ class Exporter(object):
     content_type = None
     compressable = True
 
+    # Exporters supporting workbooks accept a Workbook wherever they accept a table
+    supports_workbooks = False
+
+    def check_supported(self, table):
+        """Raise a TypeError if this exporter cannot export table (a Workbook, for example)"""
+        if isinstance(table, Workbook) and not self.supports_workbooks:
+            raise TypeError("{} does not support exporting multiple tables".format(self.__class__.__name__))
+
     def dump(self, table, fo, filename_hint=None, encoding_hint="utf-8"):
         """Write contents of a exportable to file like object. The only method the file like object
         needs to support is write, which should take bytes.
@@ -70,6 +122,7 @@ class Exporter(object):
         @param encoding_hint: encoding for bytes resulting bytes. Doesn't do anything for binary
                               formats such as ODS, XLSX or SPSS.
         """
+        self.check_supported(table)
         fo = io.BytesIO()
         self.dump(table, fo, filename_hint=filename_hint, encoding_hint=encoding_hint)
         return fo.getvalue()
@@ -86,6 +139,7 @@ class Exporter(object):
         @param encoding_hint: encoding for bytes resulting bytes. Doesn't do anything for binary
                               formats such as ODS, XLSX or SPSS.
         """
+        self.check_supported(table)
         queue = Queue(maxsize=buffer_size)
         with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
             future = executor.submit(self._dump_iter, queue, table, writer, filename_hint, encoding_hint)
@@ -17,20 +17,72 @@
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
 import csv
+import functools
+import io
 
-from exportable.exporters.base import Exporter
+from exportable.columns import Column, TextColumn
+from exportable.exporters.base import Exporter, encode, convert_batch
+from exportable.exporters.parallel import chunks, detach_column, imap_ordered
+
+
+def get_converter(column):
+    """Return a function converting a batch of values of this column to something csv.writer can
+    write as-is, or None if no conversion is needed. csv.writer already writes None as an empty
+    field and str()s ints and floats, so plain text and number columns skip to_str() altogether."""
+    to_str = type(column).to_str
+    if column.type in (int, float, str) and to_str in (Column.to_str, TextColumn.to_str):
+        return None
+    return column.to_str_many
+
+
+def encode_rows(dialect, fmtparams, converters, encoding, rows) -> bytes:
+    """Encode a chunk of rows as one block of bytes, continuing an earlier written header. This
+    is a module level function, so it can be sent to worker processes."""
+    buffer = io.StringIO(newline="")
+    csvf = csv.writer(buffer, dialect=dialect, **fmtparams)
+    csvf.writerows(convert_batch(converters, rows))
+    return encode(buffer.getvalue(), encoding, initial=False)
 
 
 class CSVExporter(Exporter):
     extension = "csv"
     content_type = "text/csv"
 
-    def __init__(self, dialect="excel", **fmtparams):
+    def __init__(self, dialect="excel", batch_size=1000, processes=0, **fmtparams):
+        """
+        @param dialect: csv dialect (name or class) passed to csv.writer
+        @param batch_size: number of rows encoded and written per fo.write() call
+        @param processes: number of worker processes used to encode batches. If 0, encode in
+                          the calling thread. Rows and non-trivial columns must be picklable.
+        @param fmtparams: formatting parameters overriding those of dialect
+        """
         self.dialect = dialect
+        self.batch_size = batch_size
+        self.processes = processes
         self.fmtparams = fmtparams
 
     def dump(self, table, fo, filename_hint=None, encoding_hint="utf-8"):
-        csvf = csv.writer(fo, dialect=self.dialect, **self.fmtparams)
-        csvf.writerow([c.label for c in table.column])
-        for row in table.rows:
-            csvf.writerow([column.to_str(value) for column, value in zip(row, table.columns)])
+        columns = list(table.columns)
+        converters = [get_converter(detach_column(c)) for c in columns]
+        encode_batch = functools.partial(encode_rows, self.dialect, self.fmtparams, converters, encoding_hint)
+
+        header = io.StringIO(newline="")
+        csv.writer(header, dialect=self.dialect, **self.fmtparams).writerow([c.label for c in columns])
+        fo.write(encode(header.getvalue(), encoding_hint))
+
+        batches = chunks(table.rows, self.batch_size)
+        if self.processes:
+            batches = imap_ordered(encode_batch, batches, processes=self.processes)
+        else:
+            batches = map(encode_batch, batches)
+
+        for batch in batches:
+            fo.write(batch)
+
+
+class TSVExporter(CSVExporter):
+    extension = "tsv"
+    content_type = "text/tab-separated-values"
+
+    def __init__(self, dialect="excel-tab", **kwargs):
+        super().__init__(dialect=dialect, **kwargs)
@@ -16,19 +16,26 @@
 # You should have received a copy of the GNU Affero General Public        #
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
+import codecs
 import json
+import math
+import shutil
+import tempfile
+from json.encoder import encode_basestring_ascii
 
-from exportable.exporters import Exporter
+from exportable.compiler import get_row_converter
+from exportable.exporters.base import Exporter, encode
+from exportable.exporters.parallel import chunks, detach_column, imap_ordered
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def to_row(serializers, row):
-    for serializer, value in zip(serializers, row):
-        if value is None:
-            yield None
-        elif serializer is not None:
-            yield serializer(value)
-        else:
-            yield value
+try:
+    import ujson
+except ImportError:
+    ujson = None
 
 
 def get_serializer(column):
@@ -38,29 +45,342 @@ def get_serializer(column):
     return column.to_str
 
 
+_dumps = json.JSONEncoder(check_circular=False).encode
+
+
+def encode_key(label):
+    """Encode label as a key of a JSON object. Like json.dumps, non-string keys such as None (the
+    label of unlabeled columns) and numbers are converted to strings first."""
+    return encode_basestring_ascii(label if isinstance(label, str) else _dumps(label))
+
+
+def encode_str(value):
+    if value is None:
+        return "null"
+    elif type(value) is str:
+        return encode_basestring_ascii(value)
+    return _dumps(value)
+
+
+def encode_int(value):
+    if value is None:
+        return "null"
+    elif type(value) is int:
+        return int.__repr__(value)
+    return _dumps(value)
+
+
+def encode_float(value):
+    if value is None:
+        return "null"
+    elif type(value) is float and math.isfinite(value):
+        return float.__repr__(value)
+    return _dumps(value)
+
+
+def get_value_encoder(column):
+    """Return a function encoding a single value of column to a JSON string."""
+    if column.type is str:
+        return encode_str
+    elif column.type is int:
+        return encode_int
+    elif column.type is float:
+        return encode_float
+
+    serializer = get_serializer(column)
+    return lambda value: "null" if value is None else encode_str(serializer(value))
+
+
+class JSONBackend(object):
+    """
+    Backends encode batches of rows as JSON objects (or arrays), separated by `separator`.
+    Subclasses only need to implement encode() and encode_columns().
+    """
+    name = None
+
+    def __init__(self, columns, encoding="utf-8", separator=",", arrays=False):
+        """
+        @param columns: columns of rows to encode
+        @param encoding: encoding of resulting bytes
+        @param separator: string written between encoded rows
+        @param arrays: encode rows as arrays instead of objects
+        """
+        self.columns = list(columns)
+        self.labels = [c.label for c in self.columns]
+        self.serializers = list(map(get_serializer, self.columns))
+        self.encoding = encoding
+        self.separator = separator
+        self.arrays = arrays
+
+    def __reduce__(self):
+        # Encoders might not be picklable, so rebuild them when sending backends to workers
+        return self.__class__, (self.columns, self.encoding, self.separator, self.arrays)
+
+    @classmethod
+    def supports(cls, encoding):
+        return True
+
+    def encode(self, rows) -> bytes:
+        """Encode a batch of rows. As the result will be written after other data, it does not
+        include a byte order mark."""
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def encode_columns(self, rows) -> [bytes]:
+        """Encode a batch of rows column by column. For each column, return the values separated
+        by commas (without brackets)."""
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def to_objects(self, rows):
+        """Return rows as dicts (or lists) of JSON serializable values."""
+        if self.arrays and not any(self.serializers):
+            return rows
+        convert_row = get_row_converter(tuple(self.serializers), None if self.arrays else tuple(self.labels))
+        return list(map(convert_row, rows))
+
+    def to_columns(self, rows):
+        """Return list of JSON serializable values for each column in rows."""
+        for serializer, values in zip(self.serializers, zip(*rows)):
+            if serializer is None:
+                yield list(values)
+            else:
+                yield [None if value is None else serializer(value) for value in values]
+
+
+class StdlibBackend(JSONBackend):
+    """
+    Encodes rows using the standard library only. Instead of building a dictionary for each row,
+    values are encoded column by column, and rows are formatted with a template containing the
+    (precomputed) encoded labels.
+    """
+    name = "stdlib"
+
+    def __init__(self, columns, encoding="utf-8", separator=",", arrays=False):
+        super().__init__(columns, encoding=encoding, separator=separator, arrays=arrays)
+        self.encoders = list(map(get_value_encoder, self.columns))
+
+        if arrays:
+            self.template = "[" + ",".join("%s" for _ in self.labels) + "]"
+        else:
+            self.template = "{" + ",".join(
+                encode_key(label).replace("%", "%%") + ":%s" for label in self.labels
+            ) + "}"
+
+    def encode(self, rows):
+        if not self.encoders:
+            return encode(self.separator.join(self.template for _ in rows), self.encoding, initial=False)
+
+        template = self.template
+        values = [list(map(encoder, values)) for encoder, values in zip(self.encoders, zip(*rows))]
+        text = self.separator.join([template % row for row in zip(*values)])
+        return encode(text, self.encoding, initial=False)
+
+    def encode_columns(self, rows):
+        return [
+            encode(",".join(map(encoder, values)), self.encoding, initial=False)
+            for encoder, values in zip(self.encoders, zip(*rows))
+        ]
+
+
+class OrjsonBackend(JSONBackend):
+    """Encodes rows with orjson, which always produces UTF-8. Note that orjson writes NaN and
+    infinite floats as null."""
+    name = "orjson"
+
+    def __init__(self, columns, encoding="utf-8", separator=",", arrays=False):
+        super().__init__(columns, encoding=encoding, separator=separator, arrays=arrays)
+        self.fallback = StdlibBackend(self.columns, encoding=encoding, separator=separator, arrays=arrays)
+
+    @classmethod
+    def supports(cls, encoding):
+        return orjson is not None and codecs.lookup(encoding).name == "utf-8"
+
+    def encode(self, rows):
+        objects = self.to_objects(rows)
+        try:
+            if self.separator == ",":
+                # Strip brackets of list
+                return orjson.dumps(objects)[1:-1]
+            return self.separator.encode().join(map(orjson.dumps, objects))
+        except orjson.JSONEncodeError:
+            # Values orjson does not support, such as integers larger than 64 bits
+            return self.fallback.encode(rows)
+
+    def encode_columns(self, rows):
+        try:
+            return [orjson.dumps(values)[1:-1] for values in self.to_columns(rows)]
+        except orjson.JSONEncodeError:
+            return self.fallback.encode_columns(rows)
+
+
+class UjsonBackend(JSONBackend):
+    """Encodes rows with ujson."""
+    name = "ujson"
+
+    @classmethod
+    def supports(cls, encoding):
+        return ujson is not None
+
+    def encode(self, rows):
+        objects = self.to_objects(rows)
+        if self.separator == ",":
+            text = ujson.dumps(objects, ensure_ascii=True, escape_forward_slashes=False)[1:-1]
+        else:
+            text = self.separator.join(ujson.dumps(o, ensure_ascii=True, escape_forward_slashes=False) for o in objects)
+        return encode(text, self.encoding, initial=False)
+
+    def encode_columns(self, rows):
+        return [
+            encode(ujson.dumps(values, ensure_ascii=True, escape_forward_slashes=False)[1:-1], self.encoding, initial=False)
+            for values in self.to_columns(rows)
+        ]
+
+
+BACKENDS = (OrjsonBackend, UjsonBackend, StdlibBackend)
+
+
+def get_backend(name=None, encoding="utf-8"):
+    """Return backend class by name. If name is None, return the fastest available backend
+    supporting the given encoding."""
+    for backend in BACKENDS:
+        if name is None and backend.supports(encoding):
+            return backend
+        elif backend.name == name:
+            if not backend.supports(encoding):
+                raise ValueError("Backend {} is not installed or does not support {}".format(name, encoding))
+            return backend
+    raise ValueError("Unknown JSON backend: {}".format(name))
+
+
+def get_schema(columns):
+    return [{"label": c.label, "type": c.type.__name__, "verbose_name": str(c.verbose_name)} for c in columns]
+
+
+def write_array(fo, batches, encoding, initial=True):
+    comma = encode(",", encoding, initial=False)
+
+    # This strange construction exists to now write a trailing comma at the end of
+    # the JSON lists, without explicitly checking for last/first rows every time.
+    fo.write(encode("[", encoding, initial=initial))
+    try:
+        batch = next(batches)
+    except StopIteration:
+        pass
+    else:
+        fo.write(batch)
+        for batch in batches:
+            fo.write(comma)
+            fo.write(batch)
+    finally:
+        # Always write trailing parentheses
+        fo.write(encode("]", encoding, initial=False))
+
+
 class JSONExporter(Exporter):
+    """
+    Writes a JSON document. Three layouts are supported:
+
+     - records: a list of objects, one for each row (default)
+     - compact: {"columns": [schema], "data": [rows]}, with each row being an array of values
+     - columns: {"columns": [schema], "data": [columns]}, with each column being an array of values
+
+    The schema lists the label, type and verbose name of each column.
+    """
     extension = "json"
     content_type = "application/json"
 
+    def __init__(self, backend=None, batch_size=1000, layout="records", spool_size=4*1024*1024):
+        """
+        @param backend: name of JSON backend ("orjson", "ujson", "stdlib"). Picks the fastest
+                        installed backend by default.
+        @param batch_size: number of rows encoded at once
+        @param layout: one of "records", "compact" or "columns"
+        @param spool_size: in the columns layout, each column is spooled to a temporary file until
+                           all rows are encoded. Each column keeps up to spool_size bytes in memory.
+        """
+        if layout not in ("records", "compact", "columns"):
+            raise ValueError("Unknown JSON layout: {}".format(layout))
+
+        self.backend = backend
+        self.batch_size = batch_size
+        self.layout = layout
+        self.spool_size = spool_size
+
     def dump(self, table, fo, filename_hint=None, encoding_hint="utf-8"):
-        # Order data in a json.dump friendly way
-        labels = [c.label for c in table.columns]
-        serializers = list(map(get_serializer, table.columns))
-        row_dicts = (dict(zip(labels, to_row(serializers, row))) for row in table.rows)
-
-        # This strange construction exists to now write a trailing comma at the end of
-        # the JSON lists, without explicitly checking for last/first rows every time.
-        fo.write("[".encode(encoding_hint))
-        try:
-            row_dict = next(row_dicts)
-        except StopIteration:
-            pass
+        columns = list(table.columns)
+        backend_cls = get_backend(self.backend, encoding_hint)
+        backend = backend_cls(columns, encoding=encoding_hint, arrays=self.layout != "records")
+        batches = chunks(table.rows, self.batch_size)
+
+        if self.layout == "records":
+            write_array(fo, map(backend.encode, batches), encoding_hint)
+            return
+
+        schema = json.dumps(get_schema(columns), check_circular=False)
+        fo.write(encode('{"columns":' + schema + ',"data":', encoding_hint))
+        if self.layout == "compact":
+            write_array(fo, map(backend.encode, batches), encoding_hint, initial=False)
         else:
-            fo.write(json.dumps(row_dict, check_circular=False).encode(encoding_hint))
-            for row_dict in row_dicts:
-                fo.write(",".encode(encoding_hint))
-                fo.write(json.dumps(row_dict, check_circular=False).encode(encoding_hint))
+            self.dump_columns(backend, batches, fo, encoding_hint)
+        fo.write(encode("}", encoding_hint, initial=False))
+
+    def dump_columns(self, backend, batches, fo, encoding_hint):
+        comma = encode(",", encoding_hint, initial=False)
+        spools = [tempfile.SpooledTemporaryFile(max_size=self.spool_size) for _ in backend.columns]
+
+        try:
+            for batch in batches:
+                for spool, values in zip(spools, backend.encode_columns(batch)):
+                    if spool.tell():
+                        spool.write(comma)
+                    spool.write(values)
+
+            open_bracket = encode("[", encoding_hint, initial=False)
+            close_bracket = encode("]", encoding_hint, initial=False)
+
+            fo.write(open_bracket)
+            for i, spool in enumerate(spools):
+                if i:
+                    fo.write(comma)
+                fo.write(open_bracket)
+                spool.seek(0)
+                shutil.copyfileobj(spool, fo)
+                fo.write(close_bracket)
+            fo.write(close_bracket)
         finally:
-            # Always write trailing parentheses
-            fo.write("]".encode(encoding_hint))
+            for spool in spools:
+                spool.close()
+
+
+class NDJSONExporter(JSONExporter):
+    """Writes newline delimited JSON (also known as JSON Lines): one object per line. Unlike
+    JSONExporter, the output can be parsed incrementally and split by line."""
+    extension = "jsonl"
+    content_type = "application/x-ndjson"
+
+    def __init__(self, backend=None, batch_size=1000, processes=0):
+        """
+        @param backend: name of JSON backend ("orjson", "ujson", "stdlib"). Picks the fastest
+                        installed backend by default.
+        @param batch_size: number of rows encoded at once
+        @param processes: number of worker processes used to encode batches. If 0, encode in
+                          the calling thread. Rows and non-trivial columns must be picklable.
+        """
+        super().__init__(backend=backend, batch_size=batch_size)
+        self.processes = processes
+
+    def dump(self, table, fo, filename_hint=None, encoding_hint="utf-8"):
+        columns = [detach_column(c) for c in table.columns]
+        backend = get_backend(self.backend, encoding_hint)(columns, encoding=encoding_hint, separator="\n")
+
+        batches = chunks(table.rows, self.batch_size)
+        if self.processes:
+            batches = imap_ordered(backend.encode, batches, processes=self.processes)
+        else:
+            batches = map(backend.encode, batches)
 
+        # Only the very first write should contain a byte order mark, if any
+        newline = encode("\n", encoding_hint, initial=False)
+        fo.write(encode("", encoding_hint))
+        for batch in batches:
+            fo.write(batch)
+            fo.write(newline)
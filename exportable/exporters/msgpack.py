@@ -0,0 +1,103 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+MessagePack exporter, based on msgpack (optional dependency). The output is a stream of
+MessagePack objects: a header describing the columns, followed by one array per row. Such
+streams can be read incrementally with msgpack.Unpacker.
+"""
+import datetime
+import uuid
+
+from exportable.compiler import get_row_converter
+from exportable.exporters.base import Exporter
+from exportable.exporters.json import get_schema
+from exportable.exporters.parallel import chunks
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def serialize_datetime(value: datetime.datetime):
+    """Convert to a MessagePack timestamp. Naive datetimes are assumed to be in UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    delta = value - UNIX_EPOCH
+    return msgpack.Timestamp(delta.days * 86400 + delta.seconds, delta.microseconds * 1000)
+
+
+def serialize_date(value: datetime.date):
+    """Convert to a MessagePack timestamp at midnight (UTC)"""
+    return msgpack.Timestamp((value.toordinal() - UNIX_EPOCH.toordinal()) * 86400)
+
+
+def serialize_uuid(value: uuid.UUID):
+    return value.bytes
+
+
+def get_converter(column):
+    """Return a function converting a value of this column to a type msgpack supports natively,
+    or None if no conversion is needed."""
+    if column.type in (int, float, str, bool, bytes):
+        return None
+    elif column.type is datetime.datetime:
+        return serialize_datetime
+    elif column.type is datetime.date:
+        return serialize_date
+    elif column.type is uuid.UUID:
+        return serialize_uuid
+    return column.to_str
+
+
+class MessagePackExporter(Exporter):
+    """
+    Writes a header map {"columns": [{"label": .., "type": .., "verbose_name": ..}, ..]}, followed
+    by an array for each row. Dates and datetimes are written as timestamps (extension type -1),
+    UUIDs as 16 bytes of binary data.
+    """
+    extension = "msgpack"
+    content_type = "application/x-msgpack"
+
+    def __init__(self, batch_size=1000):
+        """
+        @param batch_size: number of rows encoded and written per fo.write() call
+        """
+        self.batch_size = batch_size
+
+    def dump(self, table, fo, filename_hint=None, encoding_hint="utf-8"):
+        if msgpack is None:
+            raise ImportError("MessagePackExporter requires msgpack. Is it installed?")
+
+        columns = list(table.columns)
+        converters = tuple(get_converter(c) for c in columns)
+        convert_row = get_row_converter(converters)
+
+        packer = msgpack.Packer(autoreset=False, use_bin_type=True)
+        packer.pack({"columns": get_schema(columns)})
+
+        for chunk in chunks(table.rows, self.batch_size):
+            for row in map(convert_row, chunk) if any(converters) else chunk:
+                packer.pack(row)
+            fo.write(packer.bytes())
+            packer.reset()
+
+        fo.write(packer.bytes())
@@ -0,0 +1,184 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+Native ODS writer. All sheets of an OpenDocument spreadsheet live in content.xml, which is written
+row by row into a (deflated) zip entry. This keeps memory usage constant, regardless of the size
+of the exported tables.
+"""
+import datetime
+import math
+import re
+import zipfile
+from xml.sax.saxutils import quoteattr
+
+from exportable.exporters.base import convert_batch
+from exportable.exporters.parallel import chunks
+from exportable.exporters.spreadsheet import SpreadsheetExporter, to_xml_text
+
+MIMETYPE = "application/vnd.oasis.opendocument.spreadsheet"
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+MANIFEST = XML_HEADER + """\
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">\
+<manifest:file-entry manifest:full-path="/" manifest:version="1.2" manifest:media-type="{mimetype}"/>\
+<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>\
+</manifest:manifest>""".format(mimetype=MIMETYPE)
+
+# Cell style ce1 is used for dates, ce2 for datetimes
+CONTENT_START = XML_HEADER + """\
+<office:document-content \
+xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" \
+xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0" \
+xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" \
+xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" \
+xmlns:number="urn:oasis:names:tc:opendocument:xmlns:datastyle:1.0" \
+office:version="1.2">\
+<office:automatic-styles>\
+<number:date-style style:name="N1">\
+<number:year number:style="long"/><number:text>-</number:text>\
+<number:month number:style="long"/><number:text>-</number:text>\
+<number:day number:style="long"/>\
+</number:date-style>\
+<number:date-style style:name="N2">\
+<number:year number:style="long"/><number:text>-</number:text>\
+<number:month number:style="long"/><number:text>-</number:text>\
+<number:day number:style="long"/><number:text> </number:text>\
+<number:hours number:style="long"/><number:text>:</number:text>\
+<number:minutes number:style="long"/><number:text>:</number:text>\
+<number:seconds number:style="long"/>\
+</number:date-style>\
+<style:style style:name="ce1" style:family="table-cell" style:parent-style-name="Default" style:data-style-name="N1"/>\
+<style:style style:name="ce2" style:family="table-cell" style:parent-style-name="Default" style:data-style-name="N2"/>\
+</office:automatic-styles>\
+<office:body><office:spreadsheet>"""
+
+CONTENT_END = "</office:spreadsheet></office:body></office:document-content>"
+
+SPACES = re.compile("  +")
+
+
+def to_paragraphs(s: str) -> str:
+    """Convert text to ODF paragraphs, preserving newlines, tabs and runs of spaces (which would
+    otherwise be collapsed)."""
+    paragraphs = []
+    for line in to_xml_text(s).replace("\r", "").split("\n"):
+        line = SPACES.sub(lambda m: ' <text:s text:c="{}"/>'.format(len(m.group()) - 1), line)
+        paragraphs.append("<text:p>{}</text:p>".format(line.replace("\t", "<text:tab/>")))
+    return "".join(paragraphs)
+
+
+def text_cell(value):
+    return '<table:table-cell office:value-type="string">{}</table:table-cell>'.format(to_paragraphs(value))
+
+
+def float_cell(value):
+    if math.isfinite(value):
+        return '<table:table-cell office:value-type="float" office:value="{0!r}"><text:p>{0!r}</text:p></table:table-cell>'.format(value)
+    return text_cell(str(value))
+
+
+def int_cell(value):
+    return '<table:table-cell office:value-type="float" office:value="{0}"><text:p>{0}</text:p></table:table-cell>'.format(int(value))
+
+
+def bool_cell(value):
+    value = "true" if value else "false"
+    return '<table:table-cell office:value-type="boolean" office:boolean-value="{0}"><text:p>{0}</text:p></table:table-cell>'.format(value)
+
+
+def date_cell(value: datetime.date):
+    value = value.isoformat()
+    return '<table:table-cell office:value-type="date" office:date-value="{0}" table:style-name="ce1"><text:p>{0}</text:p></table:table-cell>'.format(value)
+
+
+def datetime_cell(value: datetime.datetime):
+    # ODF dates do not support timezones
+    value = value.replace(tzinfo=None).isoformat()
+    text = value.replace("T", " ")
+    return '<table:table-cell office:value-type="date" office:date-value="{}" table:style-name="ce2"><text:p>{}</text:p></table:table-cell>'.format(value, text)
+
+
+EMPTY_CELL = "<table:table-cell/>"
+
+CELL_WRITERS = {
+    str: text_cell,
+    int: int_cell,
+    float: float_cell,
+    bool: bool_cell,
+    datetime.datetime: datetime_cell,
+    datetime.date: date_cell,
+}
+
+
+class ODSExporter(SpreadsheetExporter):
+    extension = "ods"
+    content_type = MIMETYPE
+
+    # ODF does not define a limit, but LibreOffice does
+    max_rows = 1048576
+
+    def write_rows(self, columns, rows, convert=True):
+        """Yield XML of rows in batches. If convert is False (for headers), values are not
+        converted by their column."""
+        to_strs = [column.to_str for column in columns]
+
+        # Columns without a native cell type are converted to text a batch at a time
+        converters = [None if column.type in CELL_WRITERS else column.to_str_many for column in columns]
+
+        for batch in chunks(rows, self.batch_size):
+            if convert:
+                batch = convert_batch(converters, batch)
+            xml = []
+            for row in batch:
+                xml.append("<table:table-row>")
+                for to_str, value in zip(to_strs, row):
+                    if value is None:
+                        xml.append(EMPTY_CELL)
+                    else:
+                        # Values of types without a native cell type are written as text
+                        cell_writer = CELL_WRITERS.get(type(value))
+                        if cell_writer is None:
+                            xml.append(text_cell(to_str(value)))
+                        else:
+                            xml.append(cell_writer(value))
+                xml.append("</table:table-row>")
+            yield "".join(xml)
+
+    def write_sheets(self, zf, sheets):
+        # The mimetype should be the first file in the archive, and should not be compressed
+        zf.writestr("mimetype", MIMETYPE, compress_type=zipfile.ZIP_STORED)
+
+        with zf.open("content.xml", "w", force_zip64=True) as content:
+            content.write(CONTENT_START.encode())
+            for name, columns, rows in sheets:
+                self.write_sheet(content, name, columns, rows)
+            content.write(CONTENT_END.encode())
+
+        zf.writestr("META-INF/manifest.xml", MANIFEST)
+
+    def write_sheet(self, content, name, columns, rows):
+        header = [[str(column.verbose_name) for column in columns]]
+
+        content.write("<table:table table:name={}>".format(quoteattr(name)).encode())
+        for xml in self.write_rows(columns, header, convert=False):
+            content.write(xml.encode())
+        for xml in self.write_rows(columns, rows):
+            content.write(xml.encode())
+        content.write(b"</table:table>")
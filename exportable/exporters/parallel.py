@@ -0,0 +1,77 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+Helpers for exporters which can encode chunks of rows independently of each other, such as CSV.
+Encoding is offloaded to a pool of worker processes, while the encoded chunks are yielded in
+their original order.
+"""
+import collections
+import concurrent.futures
+import copy
+import itertools
+import os
+
+
+def chunks(rows, size):
+    """Divide rows into lists of (at most) size rows."""
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def detach_column(column):
+    """Return a copy of column without rowfunc and cellfunc. Those are often lambdas, which
+    cannot be pickled and are not needed to encode values which already have been extracted
+    from their rows."""
+    column = copy.copy(column)
+    column.rowfunc = None
+    column.cellfunc = None
+    return column
+
+
+def imap_ordered(func, chunks, processes=None, max_pending=None):
+    """Apply func to each chunk in a pool of worker processes and yield the results in order.
+    At most max_pending chunks are submitted to the pool at any time, which keeps memory
+    usage flat even if the consumer of this generator is slower than the workers.
+
+    @param func: picklable function (module level functions, or partials thereof)
+    @param chunks: iterable of picklable arguments to func
+    @param processes: number of worker processes. Defaults to the number of cores.
+    @param max_pending: maximum number of chunks in flight. Defaults to 2 * processes.
+    """
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or 2 * processes
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = collections.deque()
+        try:
+            for chunk in chunks:
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(func, chunk))
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Do not bother encoding chunks nobody is going to read (errors, closed generators)
+            for future in pending:
+                future.cancel()
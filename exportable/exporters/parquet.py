@@ -0,0 +1,114 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+Parquet exporter, based on pyarrow (optional dependency). Rows are converted to columns and written
+one row group at a time, so memory usage is proportional to the row group size.
+"""
+import datetime
+import uuid
+
+from exportable.exporters.base import Exporter, StreamWriter
+from exportable.exporters.parallel import chunks
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def get_arrow_type(column):
+    """Return the arrow type values of column are stored as. Types not natively supported are
+    stored as strings, using Column.to_str()."""
+    types = {
+        int: pyarrow.int64(),
+        float: pyarrow.float64(),
+        str: pyarrow.string(),
+        bool: pyarrow.bool_(),
+        datetime.date: pyarrow.date32(),
+        datetime.datetime: pyarrow.timestamp("us"),
+    }
+
+    # UUID logical type is available since pyarrow 18
+    if hasattr(pyarrow, "uuid"):
+        types[uuid.UUID] = pyarrow.uuid()
+
+    return types.get(column.type, pyarrow.string())
+
+
+def get_converter(column, arrow_type):
+    """Return a function converting a value of this column to something pyarrow accepts for
+    arrow_type, or None if no conversion is needed."""
+    if column.type is uuid.UUID and arrow_type != pyarrow.string():
+        return lambda value: value.bytes
+    elif arrow_type == pyarrow.string() and column.type is not str:
+        return column.to_str
+    return None
+
+
+def get_schema(columns):
+    return pyarrow.schema([pyarrow.field(str(c.label), get_arrow_type(c)) for c in columns])
+
+
+def to_arrays(schema, converters, rows):
+    """Transpose a batch of rows into arrow arrays, one for each column"""
+    arrays = []
+    for field, converter, values in zip(schema, converters, zip(*rows)):
+        if converter is not None:
+            values = [None if value is None else converter(value) for value in values]
+        arrays.append(pyarrow.array(values, type=field.type))
+    return arrays
+
+
+class ParquetExporter(Exporter):
+    extension = "parquet"
+    content_type = "application/vnd.apache.parquet"
+
+    # Parquet compresses its pages itself
+    compressable = False
+
+    def __init__(self, row_group_size=64*1024, compression="snappy", use_dictionary=True):
+        """
+        @param row_group_size: number of rows per row group. Memory usage is proportional to it.
+        @param compression: compression codec for data pages ("none", "snappy", "gzip", "brotli",
+                            "lz4" or "zstd")
+        @param use_dictionary: use dictionary encoding. Can also be a list of column labels.
+        """
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.use_dictionary = use_dictionary
+
+    def dump(self, table, fo, filename_hint=None, encoding_hint="utf-8"):
+        if pyarrow is None:
+            raise ImportError("ParquetExporter requires pyarrow. Is it installed?")
+
+        columns = list(table.columns)
+        schema = get_schema(columns)
+        converters = [get_converter(c, field.type) for c, field in zip(columns, schema)]
+
+        writer = pyarrow.parquet.ParquetWriter(
+            StreamWriter(fo), schema,
+            compression=self.compression,
+            use_dictionary=self.use_dictionary
+        )
+
+        with writer:
+            for chunk in chunks(table.rows, self.row_group_size):
+                batch = pyarrow.RecordBatch.from_arrays(to_arrays(schema, converters, chunk), schema=schema)
+                writer.write_batch(batch, row_group_size=self.row_group_size)
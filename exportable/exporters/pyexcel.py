@@ -16,39 +16,38 @@
 # You should have received a copy of the GNU Affero General Public        #
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
+import collections
 import itertools
 import pyexcel
 
 from exportable.exporters.base import Exporter
+from exportable.exporters.spreadsheet import get_sheets, prepare_sheets
 
 
 class PyExcelExporter(Exporter):
+    supports_workbooks = True
+
+    # Maximum number of rows per sheet (including header row)
+    max_rows = None
+
     def dump(self, table, fo, filename_hint=None, encoding_hint="utf-8"):
-        colnames = [col.verbose_name for col in table.columns]
-        sheet1 = itertools.chain([colnames], table.rows)
-        book = pyexcel.Book(sheets={"Sheet 1": sheet1})
+        # pyexcel keeps the whole book in memory anyway, so we might as well materialize sheets
+        sheets = collections.OrderedDict()
+        for name, columns, rows in prepare_sheets(get_sheets(table), self.max_rows):
+            colnames = [col.verbose_name for col in columns]
+            sheets[name] = list(itertools.chain([colnames], rows))
+        book = pyexcel.Book(sheets=sheets)
         self.dump_book(book, fo, encoding_hint=encoding_hint)
 
     def dump_book(self, book: pyexcel.Book, fo, encoding_hint="utf-8"):
         book.save_to_memory(self.extension, fo)
 
 
-class ODSExporter(PyExcelExporter):
-    extension = "ods"
-    content_type = "application/vnd.oasis.opendocument.spreadsheet"
-    compressable = False
-
-
 class XLSExporter(PyExcelExporter):
     extension = "xls"
     content_type = "application/vnd.ms-excel"
     compressable = False
-
-
-class XLSXExporter(PyExcelExporter):
-    extension = "xlsx"
-    content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    compressable = False
+    max_rows = 65536
 
 
 #class CSVExporter(PyExcelExporter):
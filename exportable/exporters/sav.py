@@ -0,0 +1,437 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+Native writer for SPSS system files (.sav). Rows are streamed into bytecode-compressed data
+records, so no external programs (PSPP) are needed and memory usage does not depend on the size
+of the table.
+
+The file format is documented by the PSPP project:
+https://www.gnu.org/software/pspp/pspp-dev/html_node/System-File-Format.html
+"""
+import datetime
+import functools
+import itertools
+import math
+import pickle
+import re
+import struct
+import sys
+import tempfile
+
+from exportable.exporters.parallel import chunks, detach_column, imap_ordered
+
+# Maximum width of string variables
+MAX_STRING_LENGTH = 2**15 - 1
+
+# Strings longer than this are stored as multiple 'segments', each holding 255 bytes
+MAX_SHORT_STRING_LENGTH = 255
+EFFECTIVE_LONG_STRING_LENGTH = 252
+
+SYSMIS = -sys.float_info.max
+HIGHEST = sys.float_info.max
+LOWEST = struct.unpack("<d", b"\xfe\xff\xff\xff\xff\xff\xef\xff")[0]
+
+# Bytecodes used in compressed data
+COMPRESSION_BIAS = 100
+CODE_PADDING = 0
+CODE_RAW = 253
+CODE_SPACES = 254
+CODE_SYSMIS = 255
+
+SPACES = b" " * 8
+
+# SPSS stores dates as seconds since the start of the Gregorian calendar
+SPSS_EPOCH = datetime.date(1582, 10, 14).toordinal()
+
+# Format types (see PSPP documentation)
+FORMAT_A = 1
+FORMAT_F = 5
+FORMAT_DATE = 20
+FORMAT_DATETIME = 22
+FORMAT_DOT = 32
+
+NUMERIC_FORMATS = {
+    int: (FORMAT_F, 8, 0),
+    float: (FORMAT_DOT, 9, 2),
+    bool: (FORMAT_F, 1, 0),
+    datetime.date: (FORMAT_DATE, 11, 0),
+    datetime.datetime: (FORMAT_DATETIME, 20, 0),
+}
+
+RESERVED_NAMES = {"ALL", "AND", "BY", "EQ", "GE", "GT", "LE", "LT", "NE", "NOT", "OR", "TO", "WITH"}
+
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+pack_double = struct.Struct("<d").pack
+
+
+def get_var_names(columns):
+    """Return unique (long name, short name) tuples for columns. Long names only contain letters,
+    digits and underscores and start with a letter. Short names are at most 8 bytes."""
+    seen_long, seen_short = set(), set()
+    for column in columns:
+        name = re.sub("[^A-Za-z0-9_]+", "", str(column.label).replace(" ", "_").replace("-", "_"))
+        name = re.sub("^[0-9_]+", "", name)[:60] or "v"
+        if name.upper() in RESERVED_NAMES:
+            name += "_"
+
+        long_name = name
+        for i in itertools.count(1):
+            if long_name.upper() not in seen_long:
+                break
+            long_name = "{}_{}".format(name, i)
+        seen_long.add(long_name.upper())
+
+        yield long_name, get_short_name(long_name, seen_short)
+
+
+def get_short_name(name, seen):
+    short_name = name.upper()[:8]
+    for i in itertools.count(1):
+        if short_name not in seen:
+            break
+        suffix = str(i)
+        short_name = name.upper()[:8 - len(suffix)] + suffix
+    seen.add(short_name)
+    return short_name
+
+
+def get_segments(width):
+    """Return (data length, declared width) for each segment of a string variable of given width."""
+    if width <= MAX_SHORT_STRING_LENGTH:
+        return [(width, width)]
+
+    n = math.ceil(width / EFFECTIVE_LONG_STRING_LENGTH)
+    segments = [(MAX_SHORT_STRING_LENGTH, MAX_SHORT_STRING_LENGTH)] * (n - 1)
+    segments.append((width - (n - 1) * MAX_SHORT_STRING_LENGTH, width - (n - 1) * EFFECTIVE_LONG_STRING_LENGTH))
+    return segments
+
+
+def get_declared_width(column):
+    """Return the width (in bytes) needed for values of column, if known from its max_length"""
+    max_length = getattr(column, "max_length", None)
+    if max_length is None:
+        return None
+    # A character takes up to four bytes in UTF-8
+    return max(1, min(max_length * 4, MAX_STRING_LENGTH))
+
+
+def get_units(width):
+    """Number of 8-byte units used by a variable with given width (0 for numeric)"""
+    return 1 if width == 0 else (width + 7) // 8
+
+
+def to_float(value):
+    return float(value)
+
+
+def date_to_float(value: datetime.date):
+    return float((value.toordinal() - SPSS_EPOCH) * 86400)
+
+
+def datetime_to_float(value: datetime.datetime):
+    seconds = value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+    return (value.toordinal() - SPSS_EPOCH) * 86400 + seconds
+
+
+def get_numeric_encoder(to_float):
+    def encode_numeric(value, codes, data):
+        if value is None:
+            codes.append(CODE_SYSMIS)
+            return
+
+        value = to_float(value)
+        if value != value:
+            codes.append(CODE_SYSMIS)
+        elif -99 <= value <= 151 and value.is_integer():
+            codes.append(int(value) + COMPRESSION_BIAS)
+        else:
+            codes.append(CODE_RAW)
+            data.append(pack_double(value))
+
+    return encode_numeric
+
+
+def get_string_encoder(width, to_str=None):
+    segments = [(length, get_units(declared) * 8) for length, declared in get_segments(width)]
+
+    def encode_string(value, codes, data):
+        if value is None:
+            value = b""
+        else:
+            if to_str is not None:
+                value = to_str(value)
+            value = value.encode("utf-8")
+            if len(value) > width:
+                # Truncate, without leaving half characters
+                value = value[:width].decode("utf-8", "ignore").encode("utf-8")
+
+        offset = 0
+        for length, size in segments:
+            segment = value[offset:offset+length]
+            offset += length
+
+            if not segment:
+                codes.extend(itertools.repeat(CODE_SPACES, size // 8))
+                continue
+
+            segment = segment.ljust(size)
+            for i in range(0, size, 8):
+                unit = segment[i:i+8]
+                if unit == SPACES:
+                    codes.append(CODE_SPACES)
+                else:
+                    codes.append(CODE_RAW)
+                    data.append(unit)
+
+    return encode_string
+
+
+class Variable(object):
+    """Variable as stored in a system file. Describes how to store a column."""
+    def __init__(self, column, name, short_name, width=None):
+        """
+        @param column: column to store
+        @param width: width of string variables, defaults to the maximum width. Ignored for
+                      numeric variables.
+        """
+        self.column = column
+        self.name = name
+        self.short_name = short_name
+        self.label = str(column.verbose_name)
+        # Converts values of string variables, None if values already are strings
+        self.to_str = None if column.type is str else column.to_str
+
+        if column.type in NUMERIC_FORMATS:
+            self.width = 0
+            self.format = NUMERIC_FORMATS[column.type]
+        else:
+            self.width = MAX_STRING_LENGTH if width is None else max(1, min(width, MAX_STRING_LENGTH))
+            self.format = (FORMAT_A, min(self.width, MAX_SHORT_STRING_LENGTH), 0)
+
+    @property
+    def segments(self):
+        return [0] if self.width == 0 else [declared for _, declared in get_segments(self.width)]
+
+    @property
+    def units(self):
+        return sum(map(get_units, self.segments))
+
+    def get_encoder(self):
+        if self.width:
+            return get_string_encoder(self.width, self.to_str)
+        elif self.column.type is datetime.datetime:
+            return get_numeric_encoder(datetime_to_float)
+        elif self.column.type is datetime.date:
+            return get_numeric_encoder(date_to_float)
+        return get_numeric_encoder(to_float)
+
+
+def get_variables(columns, widths=None):
+    """Return a Variable for each column.
+
+    @param widths: list of widths for string columns. None (or a width of None) means the maximum width.
+    """
+    columns = list(columns)
+    widths = [None] * len(columns) if widths is None else widths
+    names = get_var_names(columns)
+    return [Variable(column, name, short_name, width) for column, (name, short_name), width in zip(columns, names, widths)]
+
+
+def pack_str(s: bytes, length):
+    return s[:length].ljust(length)
+
+
+def pack_record(record_type, *fields):
+    return struct.pack("<i", record_type) + b"".join(fields)
+
+
+def get_header(variables, ncases=-1, timestamp=None):
+    """Return file header record"""
+    timestamp = timestamp or datetime.datetime.now()
+    date = "{:02d} {} {:02d}".format(timestamp.day, MONTHS[timestamp.month - 1], timestamp.year % 100)
+
+    return b"".join([
+        b"$FL2",
+        pack_str(b"@(#) SPSS DATA FILE - exportable", 60),
+        struct.pack("<iiiii", 2, sum(v.units for v in variables), 1, 0, ncases),
+        struct.pack("<d", COMPRESSION_BIAS),
+        date.encode(),
+        timestamp.strftime("%H:%M:%S").encode(),
+        pack_str(b"", 64),
+        b"\x00" * 3
+    ])
+
+
+def get_variable_records(variable: Variable, seen_short_names):
+    format_type, format_width, decimals = variable.format
+
+    for n, width in enumerate(variable.segments):
+        if n == 0:
+            short_name = variable.short_name
+            label = variable.label.encode("utf-8")[:255]
+        else:
+            short_name = get_short_name(variable.short_name, seen_short_names)
+            format_width = min(width, MAX_SHORT_STRING_LENGTH)
+            label = b""
+
+        fmt = (format_type << 16) | (format_width << 8) | decimals
+        yield pack_record(2, struct.pack("<iiiii", width, 1 if label else 0, 0, fmt, fmt), pack_str(short_name.encode(), 8))
+        if label:
+            yield struct.pack("<i", len(label)) + label.ljust((len(label) + 3) // 4 * 4)
+
+        # Strings take up one extra (continuation) record for each 8 bytes
+        for _ in range(get_units(width) - 1):
+            yield pack_record(2, struct.pack("<iiiii", -1, 0, 0, 0, 0), SPACES)
+
+
+def pack_extension(subtype, size, data: bytes):
+    return pack_record(7, struct.pack("<iii", subtype, size, len(data) // size), data)
+
+
+def get_dictionary(variables):
+    """Return all records describing variables, up to and including the terminator record."""
+    seen_short_names = {v.short_name for v in variables}
+    records = []
+    for variable in variables:
+        records.extend(get_variable_records(variable, seen_short_names))
+
+    # Machine integer info: version, machine code, float representation (IEEE), compression,
+    # endianness (little) and character code (UTF-8)
+    records.append(pack_extension(3, 4, struct.pack("<8i", 1, 0, 0, -1, 1, 1, 2, 65001)))
+    records.append(pack_extension(4, 8, struct.pack("<3d", SYSMIS, HIGHEST, LOWEST)))
+
+    long_names = "\t".join("{}={}".format(v.short_name, v.name) for v in variables)
+    records.append(pack_extension(13, 1, long_names.encode()))
+
+    very_long = "".join("{}={:05d}\0\t".format(v.short_name, v.width) for v in variables if v.width > MAX_SHORT_STRING_LENGTH)
+    if very_long:
+        records.append(pack_extension(14, 1, very_long.encode()))
+
+    records.append(pack_extension(20, 1, b"UTF-8"))
+    records.append(pack_record(999, struct.pack("<i", 0)))
+    return b"".join(records)
+
+
+def compress_rows(encoders, rows) -> bytes:
+    """Encode rows as compressed data. The result is padded to a whole number of instruction
+    blocks, so results of separate calls can be concatenated."""
+    codes, data = bytearray(), []
+    for row in rows:
+        for encoder, value in zip(encoders, row):
+            encoder(value, codes, data)
+
+    # Pad to a multiple of 8 codes (0 codes are ignored by readers)
+    codes.extend(itertools.repeat(CODE_PADDING, -len(codes) % 8))
+
+    out, data = [], iter(data)
+    for i in range(0, len(codes), 8):
+        block = codes[i:i+8]
+        out.append(bytes(block))
+        out.extend(itertools.islice(data, block.count(CODE_RAW)))
+    return b"".join(out)
+
+
+def spool_rows(columns, strings, indices, rows, spool, batch_size):
+    """Pickle rows to spool in batches, while measuring the longest encoded value of the string
+    columns at given indices. Returns a width for each of those columns.
+
+    Values of all string columns (at strings) are converted with to_str() before pickling, so
+    values only need to be picklable for numeric columns.
+    """
+    converters = [(i, columns[i].to_str) for i in strings if columns[i].type is not str]
+    widths = [1] * len(indices)
+
+    for chunk in chunks(rows, batch_size):
+        chunk = [list(row) for row in chunk]
+        for row in chunk:
+            for i, to_str in converters:
+                if row[i] is not None:
+                    row[i] = to_str(row[i])
+
+        pickle.dump(chunk, spool, pickle.HIGHEST_PROTOCOL)
+        for n, i in enumerate(indices):
+            values = (row[i] for row in chunk if row[i] is not None)
+            widths[n] = max(widths[n], max((len(value.encode("utf-8")) for value in values), default=0))
+
+    return [min(width, MAX_STRING_LENGTH) for width in widths]
+
+
+def unspool_rows(spool):
+    with spool:
+        spool.seek(0)
+        while True:
+            try:
+                chunk = pickle.load(spool)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def compress_batch(variables, rows) -> bytes:
+    """Compress a batch of rows. This is a module level function taking picklable arguments, so
+    it can be sent to worker processes."""
+    return compress_rows([variable.get_encoder() for variable in variables], rows)
+
+
+def write_sav(table, fo, widths=None, batch_size=1000, spool_size=4*1024*1024, processes=0):
+    """
+    Write a table as SPSS system file to a file like object, compressing data in batches. The
+    number of cases in the header is taken from table.size_hint, if available.
+
+    String variables are declared as wide as needed. For columns without a given width (or a
+    max_length), rows are first spooled to a temporary file to measure the longest value.
+
+    @param widths: width of each column in bytes, or None to determine it. Ignored for numeric
+                   columns.
+    @param batch_size: number of rows compressed at once
+    @param spool_size: rows are spooled to disk once they take up more than this many bytes
+    @param processes: number of worker processes used to compress batches. If 0, compress in the
+                      calling thread. Rows and columns converted with to_str() must be picklable.
+    """
+    columns = [detach_column(c) for c in table.columns]
+    widths = [get_declared_width(c) for c in columns] if widths is None else list(widths)
+    rows = table.rows
+
+    strings = [i for i, c in enumerate(columns) if c.type not in NUMERIC_FORMATS]
+    indices = [i for i in strings if widths[i] is None]
+    if indices:
+        spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        for i, width in zip(indices, spool_rows(columns, strings, indices, rows, spool, batch_size)):
+            widths[i] = width
+        rows = unspool_rows(spool)
+
+    variables = get_variables(columns, widths)
+    if indices:
+        # Spooled values are already converted
+        for i in strings:
+            variables[i].to_str = None
+    ncases = -1 if table.size_hint is None else table.size_hint
+
+    fo.write(get_header(variables, ncases))
+    fo.write(get_dictionary(variables))
+
+    if processes:
+        batches = imap_ordered(functools.partial(compress_batch, variables), chunks(rows, batch_size), processes=processes)
+    else:
+        encoders = [variable.get_encoder() for variable in variables]
+        batches = (compress_rows(encoders, chunk) for chunk in chunks(rows, batch_size))
+
+    for batch in batches:
+        fo.write(batch)
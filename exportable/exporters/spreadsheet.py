@@ -0,0 +1,164 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+Shared functionality of the native (streaming) spreadsheet exporters.
+"""
+import itertools
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from exportable.exporters.base import Exporter, StreamWriter
+from exportable.table import Workbook
+
+# Characters which are not allowed in XML documents
+ILLEGAL_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+# Maximum length of sheet names in Excel
+MAX_SHEET_NAME_LENGTH = 31
+
+# Characters not allowed in sheet names by Excel
+ILLEGAL_SHEET_NAME_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def to_xml_text(s: str) -> str:
+    return escape(ILLEGAL_XML_CHARS.sub("", s))
+
+
+def get_sheet_name(name, part):
+    """Return name of the given part (counting from 1) of a sheet split over multiple sheets."""
+    if part == 1:
+        return name
+    suffix = " ({})".format(part)
+    return name[:MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+
+
+def get_sheets(table):
+    """Return (name, table) tuples for a table or workbook"""
+    if isinstance(table, Workbook):
+        return table.sheets.items()
+    return [("Sheet 1", table)]
+
+
+def get_unique_sheet_name(name, n):
+    """Return the n-th alternative for a sheet name which is already taken. These are numbered
+    differently than the parts of split sheets (see get_sheet_name), so they cannot be confused."""
+    suffix = "_{}".format(n)
+    return name[:MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+
+
+def clean_sheet_names(sheets):
+    """Make sheet names valid and unique (case insensitively, as Excel does).
+
+    @param sheets: iterator of (name, ...) tuples
+    """
+    seen = set()
+    for name, *rest in sheets:
+        name = ILLEGAL_SHEET_NAME_CHARS.sub("_", str(name)).strip("'") or "Sheet"
+        unique_name = name[:MAX_SHEET_NAME_LENGTH]
+        for n in itertools.count(2):
+            if unique_name.lower() not in seen:
+                break
+            unique_name = get_unique_sheet_name(name, n)
+        seen.add(unique_name.lower())
+        yield (unique_name,) + tuple(rest)
+
+
+def split_sheets(sheets, max_rows=None):
+    """Split tables into sheets of at most max_rows rows (including a header row), without
+    consuming more rows than needed. Each sheet should be consumed before requesting the next.
+
+    @param sheets: iterable of (name, table) tuples
+    @return: iterator of (name, columns, rows) tuples
+    """
+    for name, table in sheets:
+        columns = list(table.columns)
+        rows = iter(table.rows)
+
+        if max_rows is None:
+            yield name, columns, rows
+            continue
+
+        for part in itertools.count(1):
+            try:
+                first = next(rows)
+            except StopIteration:
+                if part == 1:
+                    # Always write a header, even for empty tables
+                    yield name, columns, iter(())
+                break
+            rest = itertools.islice(rows, max_rows - 2)
+            yield get_sheet_name(name, part), columns, itertools.chain([first], rest)
+
+
+def prepare_sheets(sheets, max_rows=None):
+    """Make names of tables unique, split them into sheets of at most max_rows rows, and make
+    sure names of the resulting sheets are unique too (as parts might still collide with names
+    given by the user).
+
+    @param sheets: iterable of (name, table) tuples
+    @return: iterator of (name, columns, rows) tuples
+    """
+    return clean_sheet_names(split_sheets(clean_sheet_names(sheets), max_rows))
+
+
+class SpreadsheetExporter(Exporter):
+    """
+    Base class for exporters writing zipped XML spreadsheets. Subclasses need to implement
+    write_sheets(), which writes all parts of the document to a zip file. Tables with more
+    rows than fit on a single sheet continue on a new sheet, with the header row repeated.
+
+    Besides tables, these exporters accept Workbooks, which are written as one sheet per table.
+    """
+    compressable = False
+    supports_workbooks = True
+
+    # Maximum number of rows per sheet (including header row)
+    max_rows = None
+
+    def __init__(self, batch_size=1000, max_rows=None):
+        """
+        @param batch_size: number of rows written to the zip file at once
+        @param max_rows: override maximum number of rows per sheet of this format
+        """
+        self.batch_size = batch_size
+        if max_rows is not None:
+            if max_rows < 2:
+                raise ValueError("max_rows should leave room for a header and a row, got: {}".format(max_rows))
+            self.max_rows = max_rows
+
+    def dump(self, table, fo, filename_hint=None, encoding_hint="utf-8"):
+        self.dump_sheets(get_sheets(table), fo)
+
+    def dump_sheets(self, sheets, fo):
+        """Write a spreadsheet file containing a sheet for each table.
+
+        @param sheets: iterable of (name, table) tuples
+        @param fo: file like object
+        """
+        with zipfile.ZipFile(StreamWriter(fo), "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            self.write_sheets(zf, prepare_sheets(sheets, self.max_rows))
+
+    def write_sheets(self, zf: zipfile.ZipFile, sheets):
+        """Write document to zip file.
+
+        @param sheets: iterator of (name, columns, rows) tuples
+        """
+        raise NotImplementedError("Subclasses should implement this method.")
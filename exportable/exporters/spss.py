@@ -18,7 +18,6 @@
 ###########################################################################
 import functools
 import re
-import io
 import struct
 import subprocess
 import itertools
@@ -27,11 +26,15 @@ import datetime
 import collections
 import os.path
 import logging
+import shutil
 
 from threading import Thread
 
 from exportable.columns import Column
+from exportable.compiler import get_row_formatter
 from exportable.exporters.base import Exporter
+from exportable.exporters.parallel import chunks
+from exportable.exporters.sav import write_sav, get_declared_width
 from exportable.table import Table
 
 log = logging.getLogger(__name__)
@@ -67,6 +70,7 @@ class PSPPError(Exception):
     pass
 
 
+@functools.lru_cache()
 def get_pspp_version() -> PSPPVersion:
     try:
         process = subprocess.Popen(["pspp", "--version"], stdout=subprocess.PIPE)
@@ -97,28 +101,24 @@ def get_var_name(col: Column, seen: set):
     return fn
 
 
+def get_pspp_type(column: Column):
+    width = get_declared_width(column)
+    if column.type is str and width is not None:
+        return "A{}".format(width)
+    return PSPP_TYPES[column.type]
+
+
 @functools.lru_cache(maxsize=128)
 def get_pspp_commands(table: Table, outfile: str, infile="/dev/null") -> bytes:
     # Deduce cleaned variable names and variable types
     seen = set()
     varnames = {col: get_var_name(col, seen) for col in table.columns}
-    variables = [(varnames[col], PSPP_TYPES[col.type]) for col in table.columns]
+    variables = [(varnames[col], get_pspp_type(col)) for col in table.columns]
     variables = " ".join(map(str, itertools.chain.from_iterable(variables)))
     commands = PSPP_COMMANDS.format(infile=infile, outfile=outfile, variables=variables)
     return commands.encode()
 
 
-def chunkify(it, size=0):
-    if not size:
-        return it
-
-    filler = object()
-    iters = [iter(it)] * size
-
-    for chunk in itertools.zip_longest(*iters, fillvalue=filler):
-        yield (value for value in chunk if value is not filler)
-
-
 def exec_pspp(commands: bytes):
     """Executes PSPP with given commands as input (through stdin)."""
     log.debug("Starting PSPP")
@@ -147,14 +147,20 @@ def exec_pspp(commands: bytes):
         raise PSPPError("PSPP Exited with error: \n\n%s" % stdout)
 
 
-def copyfileobj(fsrc, fdst, length=16*1024, skip_first=0):
-    """Copy of shutil.copyfileobj, with added 'skip_first' parameter."""
-    fsrc.read(skip_first)
-    while 1:
-        buf = fsrc.read(length)
-        if not buf:
-            break
-        fdst.write(buf)
+def copy_output(fsrc, fdst, ncases=None):
+    """Copy PSPP output to fdst. PSPP cannot seek back to update the number of cases in the
+    header when writing to a fifo, so we fill it in ourselves if known."""
+    header = fsrc.read(0x54)
+    if ncases is not None:
+        header = header[:0x50] + struct.pack("<i", ncases)
+    fdst.write(header)
+    shutil.copyfileobj(fsrc, fdst)
+
+
+def release_fifo(path):
+    """Open and close a fifo without blocking, so threads waiting to open the other end (or
+    blocked writing to it) are released."""
+    os.close(os.open(path, os.O_RDWR | os.O_NONBLOCK))
 
 
 def serialize_str(s):
@@ -182,30 +188,40 @@ def get_serializer(column):
         raise ValueError("Did not recognize serializer type for: {}".format(column))
 
 
-def write_data(table: Table, rows, fp):
-    serializers = list(map(get_serializer, table.columns))
-    for row in rows:
-        for serializer, value in zip(serializers, row):
-            if value is not None:
-                fp.write(serializer(value).encode())
-            fp.write(b"\t")
-        fp.write(b"\n")
-    fp.close()
+def write_data(table: Table, rows, fp, chunksize=1000):
+    format_row = get_row_formatter(tuple(map(get_serializer, table.columns)), "\t")
+    with fp:
+        for chunk in chunks(rows, chunksize):
+            fp.write("".join(map(format_row, chunk)).encode())
+
+
+def run_thread(target, errors: list):
+    """Start a daemon thread running target, appending any exception it raises to errors"""
+    def run():
+        try:
+            target()
+        except BaseException as e:
+            errors.append(e)
+
+    thread = Thread(target=run, daemon=True)
+    thread.start()
+    return thread
 
 
 def write_table(table, fp, chunksize=1000):
     """
-    Write a given table to a file like object. Depending on the chunk size, this function will not
-    load all rows of the table in memory at once.
+    Write a given table to a file like object. A single PSPP process converts all rows, which are
+    fed to it through a fifo while its output is copied to fp. Depending on the chunk size, this
+    function will not load all rows of the table in memory at once.
 
     @param table: table to serialize to a SPSS system file
     @param fp: file like object to write to
-    @param chunksize: if 0, do not use chunks (keeps every row in memory!)
+    @param chunksize: number of rows serialized per write to PSPP
     """
     log.debug("Check if we've got the right version of PSPP installed")
     version = get_pspp_version()
     if version < PSPPVersion(0, 8, 5):
-        raise PSPPVersion("Expected pspp>=8.5.0, but found {}".format(version))
+        raise PSPPError("Expected pspp>=0.8.5, but found {}".format(version))
 
     # Create fifos
     tmp_dir = tempfile.mkdtemp(prefix="amcat-pspp-")
@@ -215,45 +231,29 @@ def write_table(table, fp, chunksize=1000):
     os.mkfifo(fifo_out)
 
     try:
-        # Prepare buffer for header
-        header_buffer = io.BytesIO()
-        out_copy_target = lambda: copyfileobj(open(fifo_out, "rb"), header_buffer)
-        out_copy_thread = Thread(target=out_copy_target)
-        out_copy_thread.start()
-
-        # Execute PSPP
-        exec_pspp(get_pspp_commands(table, fifo_out))
-
-        # Wait for copying to finish
-        out_copy_thread.join()
-
-        # Write expected number of rows to header
-        header_buffer.seek(0x50)
-        header_buffer.write(struct.pack("<i", len(table)))
-        header_buffer.seek(0)
-        copyfileobj(header_buffer, fp)
-
-        # Determine header length
-        header_length = len(header_buffer.getvalue())
-
-        # Write data in chunks
-        for chunk in chunkify(table.rows, size=chunksize):
-            # PSPP outfile -> caller buffer. We skip writing the header, only data.
-            out_copy_target = lambda: copyfileobj(open(fifo_out, "rb"), fp, skip_first=header_length)
-            out_copy_thread = Thread(target=out_copy_target)
-            out_copy_thread.start()
-
-            # Table row chunk -> PSPP
-            in_copy_target = lambda: write_data(table, chunk, open(fifo_in, "wb"))
-            in_copy_thread = Thread(target=in_copy_target)
-            in_copy_thread.start()
-
-            # let PSPP generate data for given chunk
-            exec_pspp(get_pspp_commands(table, fifo_out, fifo_in))
+        errors = []
 
-            out_copy_thread.join()
+        # PSPP outfile -> caller buffer
+        out_copy_target = lambda: copy_output(open(fifo_out, "rb"), fp, table.size_hint)
+        out_copy_thread = run_thread(out_copy_target, errors)
+
+        # Table rows -> PSPP
+        in_copy_target = lambda: write_data(table, table.rows, open(fifo_in, "wb"), chunksize)
+        in_copy_thread = run_thread(in_copy_target, errors)
+
+        try:
+            exec_pspp(get_pspp_commands(table, fifo_out, fifo_in))
+        except:
+            # PSPP might not have opened (or finished reading) our fifos
+            release_fifo(fifo_in)
+            release_fifo(fifo_out)
+            raise
+        finally:
             in_copy_thread.join()
+            out_copy_thread.join()
 
+        if errors:
+            raise errors[0]
     finally:
         os.unlink(fifo_in)
         os.unlink(fifo_out)
@@ -264,6 +264,26 @@ class SPSSExporter(Exporter):
     extension = "sav"
     content_type = "application/x-spss-sav"
 
+    def __init__(self, backend="native", batch_size=1000, spool_size=4*1024*1024, processes=0):
+        """
+        @param backend: "native" writes system files directly, "pspp" converts rows using an
+                        installed PSPP (>= 0.8.5), which needs a table with a size_hint.
+        @param batch_size: number of rows converted at once
+        @param spool_size: the native backend measures string widths by spooling rows to a
+                           temporary file first, keeping up to spool_size bytes in memory
+        @param processes: number of worker processes the native backend uses to compress
+                          batches. If 0, compress in the calling thread.
+        """
+        if backend not in ("native", "pspp"):
+            raise ValueError("Unknown SPSS backend: {!r}".format(backend))
+        self.backend = backend
+        self.batch_size = batch_size
+        self.spool_size = spool_size
+        self.processes = processes
+
     def dump(self, table, fo, filename_hint=None, encoding_hint="utf-8"):
-        write_table(table, fo)
+        if self.backend == "pspp":
+            write_table(table, fo, chunksize=self.batch_size)
+        else:
+            write_sav(table, fo, batch_size=self.batch_size, spool_size=self.spool_size, processes=self.processes)
 
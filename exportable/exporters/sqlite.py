@@ -0,0 +1,131 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+SQLite exporter. SQLite needs random access to its database file, so rows are loaded into a
+temporary database first, which is copied to the output afterwards.
+"""
+import datetime
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from exportable.compiler import get_row_converter
+from exportable.exporters.base import Exporter
+from exportable.exporters.parallel import chunks
+
+# Declared column types. Dates are stored as ISO 8601 text, which SQLite's date functions (and
+# sqlite3's PARSE_DECLTYPES) understand.
+SQLITE_TYPES = {
+    int: "INTEGER",
+    float: "REAL",
+    str: "TEXT",
+    bool: "BOOLEAN",
+    datetime.date: "DATE",
+    datetime.datetime: "TIMESTAMP",
+}
+
+# Pragmas used while loading. The database is a temporary file until it is complete, so there
+# is no need to protect it against crashes.
+LOAD_PRAGMAS = (
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def quote(identifier):
+    return '"{}"'.format(str(identifier).replace('"', '""'))
+
+
+def serialize_datetime(value: datetime.datetime):
+    return value.isoformat(" ")
+
+
+def serialize_date(value: datetime.date):
+    return value.isoformat()
+
+
+def get_converter(column):
+    """Return a function converting a value of this column to a type sqlite3 supports, or None if
+    no conversion is needed."""
+    if column.type in (int, float, str, bool):
+        return None
+    elif column.type is datetime.datetime:
+        return serialize_datetime
+    elif column.type is datetime.date:
+        return serialize_date
+    return column.to_str
+
+
+def get_create_table(name, columns):
+    fields = ", ".join("{} {}".format(quote(c.label), SQLITE_TYPES.get(c.type, "TEXT")) for c in columns)
+    return "CREATE TABLE {} ({})".format(quote(name), fields)
+
+
+def write_database(table, path, table_name="data", batch_size=10000, indexes=()):
+    """
+    Load a table into a new SQLite database at path. All rows are inserted in a single
+    transaction, in batches of batch_size rows.
+
+    @param indexes: labels of columns to create an index on, after loading all rows
+    """
+    columns = list(table.columns)
+    converters = tuple(get_converter(c) for c in columns)
+    convert_row = get_row_converter(converters)
+    insert = "INSERT INTO {} VALUES ({})".format(quote(table_name), ", ".join("?" * len(columns)))
+
+    db = sqlite3.connect(path, isolation_level=None)
+    try:
+        for pragma in LOAD_PRAGMAS:
+            db.execute(pragma)
+
+        db.execute("BEGIN")
+        db.execute(get_create_table(table_name, columns))
+        for chunk in chunks(table.rows, batch_size):
+            db.executemany(insert, map(convert_row, chunk) if any(converters) else chunk)
+        db.execute("COMMIT")
+
+        for label in indexes:
+            index_name = "ix_{}_{}".format(table_name, label)
+            db.execute("CREATE INDEX {} ON {} ({})".format(quote(index_name), quote(table_name), quote(label)))
+    finally:
+        db.close()
+
+
+class SQLiteExporter(Exporter):
+    extension = "sqlite"
+    content_type = "application/vnd.sqlite3"
+
+    def __init__(self, table_name="data", batch_size=10000, indexes=()):
+        """
+        @param table_name: name of the table created in the database
+        @param batch_size: number of rows inserted per executemany() call
+        @param indexes: labels of columns to index. Indexes are built after loading all rows.
+        """
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.indexes = indexes
+
+    def dump(self, table, fo, filename_hint=None, encoding_hint="utf-8"):
+        with tempfile.TemporaryDirectory(prefix="exportable-") as tmp_dir:
+            path = os.path.join(tmp_dir, "export.sqlite")
+            write_database(table, path, self.table_name, self.batch_size, self.indexes)
+            with open(path, "rb") as db:
+                shutil.copyfileobj(db, fo)
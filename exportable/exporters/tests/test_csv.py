@@ -0,0 +1,90 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import csv
+import datetime
+import io
+import unittest
+
+from exportable import columns
+from exportable.exporters import CSVExporter, TSVExporter
+from exportable.table import ListTable
+
+
+class TestCSVExporter(unittest.TestCase):
+    def get_table(self):
+        return ListTable(rows=iter([
+            [None,  datetime.datetime(2020, 9, 8, 12, 11, 10), 1.5,  "♝"],
+            [74321, None,                                      3.0,  "a,\"b\"\nc"],
+            [5,     datetime.datetime(2010, 5, 4),             None, None]
+        ]), columns=[
+            columns.IntColumn("a"),
+            columns.DateTimeColumn("b"),
+            columns.FloatColumn("c"),
+            columns.TextColumn("d"),
+        ])
+
+    def test_dump(self):
+        data = self.get_table().dumps("csv").decode()
+        self.assertEqual(list(csv.reader(io.StringIO(data, newline=""))), [
+            ["a", "b", "c", "d"],
+            ["", "2020-09-08T12:11:10", "1.5", "♝"],
+            ["74321", "", "3.0", "a,\"b\"\nc"],
+            ["5", "2010-05-04T00:00:00", "", ""],
+        ])
+
+    def test_batches(self):
+        """Output should not depend on batch size"""
+        expected = CSVExporter().dumps(self.get_table())
+        for batch_size in (1, 2, 3, 4):
+            self.assertEqual(expected, CSVExporter(batch_size=batch_size).dumps(self.get_table()))
+
+    def test_encoding(self):
+        data = self.get_table().dumps("csv", encoding_hint="utf-16")
+        self.assertIn("♝", data.decode("utf-16"))
+
+    def test_byte_order_mark(self):
+        """Encodings with a BOM should only write it once, at the start of the file"""
+        data = CSVExporter(batch_size=1).dumps(self.get_table(), encoding_hint="utf-16")
+        self.assertEqual(1, data.count("\ufeff".encode("utf-16-le")))
+
+    def test_empty(self):
+        table = ListTable(rows=[], columns=[columns.IntColumn("a"), columns.IntColumn("b")])
+        self.assertEqual(b"a,b\r\n", table.dumps("csv"))
+
+    def test_tsv(self):
+        data = self.get_table().dumps("tsv").decode()
+        self.assertEqual(data.splitlines()[0], "a\tb\tc\td")
+        self.assertEqual(data.splitlines()[1], "\t2020-09-08T12:11:10\t1.5\t♝")
+
+    def test_dialect(self):
+        exporter = CSVExporter(delimiter=";", lineterminator="\n")
+        self.assertEqual(b"a;b;c;d\n;2020", exporter.dumps(self.get_table())[:13])
+
+        exporter = TSVExporter(lineterminator="\n")
+        self.assertEqual(b"a\tb\tc\td\n\t2020", exporter.dumps(self.get_table())[:13])
+
+    def test_parallel(self):
+        """Parallel encoding should yield exactly the same bytes, in the same order"""
+        rows = [[i, datetime.datetime(2020, 1, 1, i % 24), i / 3, str(i)] for i in range(1000)]
+        cols = [columns.IntColumn("a"), columns.DateTimeColumn("b", cache_size=10), columns.FloatColumn("c"), columns.TextColumn("d")]
+
+        expected = CSVExporter().dumps(ListTable(rows=rows, columns=cols))
+        exporter = CSVExporter(batch_size=7, processes=2)
+        self.assertEqual(expected, exporter.dumps(ListTable(rows=rows, columns=cols)))
+        self.assertEqual(expected, b"".join(exporter.dump_iter(ListTable(rows=rows, columns=cols))))
@@ -21,6 +21,8 @@ import json
 import unittest
 
 from exportable import columns
+from exportable.exporters import JSONExporter, NDJSONExporter
+from exportable.exporters.json import BACKENDS, get_backend, ujson
 from exportable.table import ListTable
 
 
@@ -54,3 +56,121 @@ class TestJSONExporter(unittest.TestCase):
         ]
 
         self.assertEqual(data, expected_data)
+
+    def test_backends(self):
+        """All installed backends should produce the same JSON"""
+        rows = [
+            [1, "a\"b\\c/\u265d\n", datetime.date(2010, 5, 4), 1.5, -0.0],
+            [None, None, None, None, 1e100],
+            [-2**70, "", datetime.date(2010, 5, 5), 3.0, 0.1],
+        ] * 3
+        cols = [
+            columns.IntColumn("a%s"),
+            columns.TextColumn("b\""),
+            columns.DateColumn("\u265d"),
+            columns.FloatColumn("d"),
+            columns.FloatColumn("e"),
+        ]
+
+        expected = json.loads(json.dumps([
+            {c.label: (c.to_str(v) if isinstance(v, datetime.date) else v) for c, v in zip(cols, row)}
+            for row in rows
+        ]))
+
+        for backend in BACKENDS:
+            if backend.supports("utf-8"):
+                for batch_size in (1, 2, 100):
+                    exporter = JSONExporter(backend=backend.name, batch_size=batch_size)
+                    data = exporter.dumps(ListTable(rows=rows, columns=cols))
+                    self.assertEqual(repr(expected), repr(json.loads(data.decode())), backend.name)
+
+    def test_unlabeled(self):
+        """Labels which are not strings (such as those of unlabeled columns) are converted like
+        json.dumps converts keys"""
+        cols = [columns.IntColumn(), columns.IntColumn(1)]
+        for backend in BACKENDS:
+            if backend.supports("utf-8"):
+                data = JSONExporter(backend=backend.name).dumps(ListTable(rows=[[1, 2]], columns=cols))
+                self.assertEqual([{"null": 1, "1": 2}], json.loads(data.decode()), backend.name)
+
+    def test_get_backend(self):
+        self.assertEqual("stdlib", get_backend("stdlib").name)
+        # orjson only writes UTF-8
+        self.assertEqual("ujson" if ujson is not None else "stdlib", get_backend(encoding="utf-16").name)
+        self.assertRaises(ValueError, get_backend, "foo")
+
+    def test_encoding(self):
+        table = ListTable(rows=[["\u265d"], ["b"]], columns=[columns.TextColumn("a")])
+        data = JSONExporter(batch_size=1).dumps(table, encoding_hint="utf-16")
+        self.assertEqual([{"a": "\u265d"}, {"a": "b"}], json.loads(data.decode("utf-16")))
+
+    def test_empty(self):
+        self.assertEqual([], json.loads(ListTable(rows=[], columns=[]).dumps("json").decode()))
+        self.assertEqual([{}, {}], json.loads(ListTable(rows=[[], []], columns=[]).dumps("json").decode()))
+
+
+class TestNDJSONExporter(unittest.TestCase):
+    def get_table(self):
+        rows = [[i, datetime.datetime(2020, 1, 1, i % 24), "♝\n" * (i % 3)] for i in range(100)]
+        return ListTable(rows=rows, columns=[
+            columns.IntColumn("a"),
+            columns.DateTimeColumn("b"),
+            columns.TextColumn("c"),
+        ])
+
+    def test_dump(self):
+        lines = self.get_table().dumps("jsonl").decode().splitlines()
+        self.assertEqual(100, len(lines))
+        self.assertEqual({"a": 4, "b": "2020-01-01T04:00:00", "c": "♝\n"}, json.loads(lines[4]))
+
+    def test_parallel(self):
+        expected = NDJSONExporter(backend="stdlib").dumps(self.get_table())
+        exporter = NDJSONExporter(backend="stdlib", batch_size=7, processes=2)
+        self.assertEqual(expected, exporter.dumps(self.get_table()))
+
+    def test_encoding(self):
+        data = NDJSONExporter(batch_size=1).dumps(self.get_table(), encoding_hint="utf-16")
+        self.assertEqual(100, len(data.decode("utf-16").splitlines()))
+
+
+class TestJSONLayouts(unittest.TestCase):
+    def get_table(self):
+        return ListTable(rows=iter([
+            [1, datetime.date(2020, 1, 2), "a"],
+            [None, None, "♝"],
+            [3, datetime.date(2020, 1, 4), None],
+        ]), columns=[
+            columns.IntColumn("a"),
+            columns.DateColumn("b", verbose_name="Date"),
+            columns.TextColumn("c"),
+        ])
+
+    schema = [
+        {"label": "a", "type": "int", "verbose_name": "a"},
+        {"label": "b", "type": "date", "verbose_name": "Date"},
+        {"label": "c", "type": "str", "verbose_name": "c"},
+    ]
+
+    def test_compact(self):
+        for backend in BACKENDS:
+            if backend.supports("utf-8"):
+                exporter = JSONExporter(backend=backend.name, layout="compact", batch_size=2)
+                self.assertEqual(json.loads(exporter.dumps(self.get_table()).decode()), {
+                    "columns": self.schema,
+                    "data": [[1, "2020-01-02", "a"], [None, None, "♝"], [3, "2020-01-04", None]]
+                })
+
+    def test_columns(self):
+        for backend in BACKENDS:
+            if backend.supports("utf-8"):
+                exporter = JSONExporter(backend=backend.name, layout="columns", batch_size=2, spool_size=4)
+                self.assertEqual(json.loads(exporter.dumps(self.get_table()).decode()), {
+                    "columns": self.schema,
+                    "data": [[1, None, 3], ["2020-01-02", None, "2020-01-04"], ["a", "♝", None]]
+                })
+
+    def test_empty(self):
+        table = ListTable(rows=[], columns=[columns.IntColumn("a")])
+        data = JSONExporter(layout="columns").dumps(table, encoding_hint="utf-16")
+        self.assertEqual({"columns": self.schema[:1], "data": [[]]}, json.loads(data.decode("utf-16")))
+        self.assertRaises(ValueError, JSONExporter, layout="foo")
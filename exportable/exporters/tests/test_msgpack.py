@@ -0,0 +1,70 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import datetime
+import io
+import unittest
+import uuid
+
+from exportable.columns import IntColumn, FloatColumn, TextColumn, BooleanField, DateColumn, DateTimeColumn, UUIDColumn
+from exportable.exporters import MessagePackExporter
+from exportable.table import ListTable
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+@unittest.skipUnless(msgpack, "msgpack not installed")
+class TestMessagePackExporter(unittest.TestCase):
+    def setUp(self):
+        self.uuid = uuid.uuid4()
+        self.rows = [
+            [1, 1.5, "♝", True, datetime.date(2020, 1, 2), datetime.datetime(2020, 1, 2, 3, 4, 5, 6), self.uuid],
+            [None, None, None, None, None, None, None],
+            [-2**40, -1.0, "", False, datetime.date(1900, 1, 1), datetime.datetime(1969, 12, 31, 23, 59, 59, 500000), self.uuid],
+        ]
+
+    def get_table(self):
+        return ListTable(rows=self.rows, columns=[
+            IntColumn("i"), FloatColumn("f"), TextColumn("s"), BooleanField("b"),
+            DateColumn("d"), DateTimeColumn("dt"), UUIDColumn("u")
+        ])
+
+    def load(self, data):
+        return list(msgpack.Unpacker(io.BytesIO(data), timestamp=3))
+
+    def test_header(self):
+        header, *rows = self.load(MessagePackExporter().dumps(self.get_table()))
+        self.assertEqual([c["label"] for c in header["columns"]], ["i", "f", "s", "b", "d", "dt", "u"])
+        self.assertEqual([c["type"] for c in header["columns"]], ["int", "float", "str", "bool", "date", "datetime", "UUID"])
+        self.assertEqual(len(rows), 3)
+
+    def test_values(self):
+        _, *rows = self.load(MessagePackExporter(batch_size=2).dumps(self.get_table()))
+
+        utc = datetime.timezone.utc
+        self.assertEqual(rows[0], [1, 1.5, "♝", True, datetime.datetime(2020, 1, 2, tzinfo=utc), datetime.datetime(2020, 1, 2, 3, 4, 5, 6, tzinfo=utc), self.uuid.bytes])
+        self.assertEqual(rows[1], [None] * 7)
+        self.assertEqual(rows[2][4], datetime.datetime(1900, 1, 1, tzinfo=utc))
+        self.assertEqual(rows[2][5], datetime.datetime(1969, 12, 31, 23, 59, 59, 500000, tzinfo=utc))
+
+    def test_dump_iter(self):
+        exporter = MessagePackExporter(batch_size=1)
+        self.assertEqual(exporter.dumps(self.get_table()), b"".join(exporter.dump_iter(self.get_table())))
@@ -0,0 +1,73 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import datetime
+import io
+import unittest
+import uuid
+import zipfile
+
+import pyexcel
+
+from exportable import columns
+from exportable.exporters import ODSExporter
+from exportable.table import ListTable
+
+
+class TestODSExporter(unittest.TestCase):
+    def get_table(self, rows):
+        return ListTable(rows=iter(rows), columns=[
+            columns.IntColumn("a", verbose_name="A <&>"),
+            columns.DateTimeColumn("b"),
+            columns.FloatColumn("c"),
+            columns.TextColumn("d"),
+            columns.DateColumn("e"),
+            columns.UUIDColumn("f"),
+        ])
+
+    def test_dump(self):
+        test_uuid = uuid.uuid4()
+        rows = [
+            [1, datetime.datetime(2020, 9, 8, 12, 11, 10), 1.5, "♝  <b>\x01", datetime.date(2020, 1, 2), test_uuid],
+            [None, None, None, "", None, None],
+            [3, None, 2.0, "x", None, None],
+        ]
+
+        data = self.get_table(rows).dumps("ods")
+        self.assertEqual("mimetype", zipfile.ZipFile(io.BytesIO(data)).namelist()[0])
+
+        sheet = pyexcel.get_sheet(file_content=data, file_type="ods")
+        self.assertEqual("Sheet 1", sheet.name)
+        self.assertEqual([
+            ["A <&>", "b", "c", "d", "e", "f"],
+            [1, datetime.datetime(2020, 9, 8, 12, 11, 10), 1.5, "♝  <b>", datetime.date(2020, 1, 2), str(test_uuid)],
+            ["", "", "", "", "", ""],
+            [3, "", 2, "x", "", ""],
+        ], sheet.to_array())
+
+    def test_dump_iter(self):
+        rows = [[i, None, i / 4, "a\nb\tc", None, None] for i in range(3000)]
+        data = b"".join(ODSExporter(batch_size=100).dump_iter(self.get_table(rows)))
+
+        # Streamed content should be written with ZIP64 extensions, or sheets over 2 GiB would fail
+        info = zipfile.ZipFile(io.BytesIO(data)).getinfo("content.xml")
+        self.assertEqual(zipfile.ZIP64_VERSION, info.extract_version)
+
+        sheet = pyexcel.get_sheet(file_content=data, file_type="ods")
+        self.assertEqual(3001, sheet.number_of_rows())
+        self.assertEqual([2999, "", 2999 / 4, "a\nb\tc"], sheet.row_at(3000)[:4])
@@ -0,0 +1,83 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import datetime
+import io
+import unittest
+import uuid
+
+from exportable.columns import IntColumn, FloatColumn, TextColumn, BooleanField, DateColumn, DateTimeColumn, UUIDColumn
+from exportable.exporters import ParquetExporter
+from exportable.table import ListTable
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipUnless(pyarrow, "pyarrow not installed")
+class TestParquetExporter(unittest.TestCase):
+    def setUp(self):
+        self.uuid = uuid.uuid4()
+        self.rows = [
+            [1, 1.5, "♝", True, datetime.date(2020, 1, 2), datetime.datetime(2020, 1, 2, 3, 4, 5, 6), self.uuid],
+            [None, None, None, None, None, None, None],
+            [-2**40, -1.0, "", False, datetime.date(1900, 1, 1), datetime.datetime(1970, 1, 1), self.uuid],
+        ]
+
+    def get_table(self, rows=None):
+        return ListTable(rows=self.rows if rows is None else rows, columns=[
+            IntColumn("i"), FloatColumn("f"), TextColumn("s"), BooleanField("b"),
+            DateColumn("d"), DateTimeColumn("dt"), UUIDColumn("u")
+        ])
+
+    def read(self, data):
+        return pyarrow.parquet.ParquetFile(io.BytesIO(data))
+
+    def test_types(self):
+        parquet = self.read(ParquetExporter().dumps(self.get_table()))
+        schema = parquet.schema_arrow
+        self.assertEqual(schema.names, ["i", "f", "s", "b", "d", "dt", "u"])
+        self.assertEqual(str(schema.field("i").type), "int64")
+        self.assertEqual(str(schema.field("d").type), "date32[day]")
+        self.assertEqual(str(schema.field("dt").type), "timestamp[us]")
+
+        rows = [list(row.values()) for row in parquet.read().to_pylist()]
+        expected = [[str(v) if isinstance(v, uuid.UUID) and not hasattr(pyarrow, "uuid") else v for v in row] for row in self.rows]
+        self.assertEqual(rows, expected)
+
+    def test_row_groups(self):
+        exporter = ParquetExporter(row_group_size=2)
+        parquet = self.read(exporter.dumps(self.get_table()))
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        self.assertEqual(parquet.metadata.num_rows, 3)
+
+        # Streaming through dump_iter yields the same file
+        self.assertEqual(exporter.dumps(self.get_table()), b"".join(exporter.dump_iter(self.get_table())))
+
+    def test_options(self):
+        data = ParquetExporter(compression="gzip", use_dictionary=False).dumps(self.get_table())
+        column = self.read(data).metadata.row_group(0).column(2)
+        self.assertEqual(column.compression, "GZIP")
+        self.assertNotIn("RLE_DICTIONARY", column.encodings)
+
+    def test_empty(self):
+        parquet = self.read(ParquetExporter().dumps(self.get_table([])))
+        self.assertEqual(parquet.metadata.num_rows, 0)
+        self.assertEqual(len(parquet.schema_arrow), 7)
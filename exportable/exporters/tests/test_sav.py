@@ -0,0 +1,185 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import datetime
+import io
+import shutil
+import subprocess
+import tempfile
+import threading
+import unittest
+import uuid
+
+from exportable.columns import Column, IntColumn, DateTimeColumn, TextColumn, FloatColumn, DateColumn, BooleanField, UUIDColumn
+from exportable.exporters import SPSSExporter
+from exportable.exporters.sav import write_sav, get_segments
+from exportable.table import ListTable
+
+try:
+    import pyreadstat
+except ImportError:
+    pyreadstat = None
+
+
+def to_python(value):
+    if value != value:
+        # NaN and NaT
+        return None
+    elif hasattr(value, "to_pydatetime"):
+        return value.to_pydatetime()
+    return value
+
+
+def read_sav(data: bytes):
+    """Read a system file with pyreadstat, which shares no code with the writer. Returns the
+    variable names, labels, widths (0 for numeric variables) and rows."""
+    with tempfile.NamedTemporaryFile(suffix=".sav") as fo:
+        fo.write(data)
+        fo.flush()
+        df, meta = pyreadstat.read_sav(fo.name)
+
+    # Formats of string variables are "A<width>"
+    names = meta.column_names
+    types = meta.readstat_variable_types
+    widths = [0 if types[name] == "double" else int(meta.original_variable_types[name][1:]) for name in names]
+    rows = [[to_python(value) for value in row] for row in df.itertuples(index=False)]
+    return names, meta.column_labels, widths, rows
+
+
+class ObjectColumn(Column):
+    def __init__(self, label=None, **kwargs):
+        super().__init__(object, label, **kwargs)
+
+
+class TestSegments(unittest.TestCase):
+    def test_segments(self):
+        self.assertEqual(get_segments(10), [(10, 10)])
+        self.assertEqual(get_segments(255), [(255, 255)])
+        self.assertEqual(get_segments(600), [(255, 255), (255, 255), (90, 96)])
+
+
+@unittest.skipUnless(pyreadstat, "pyreadstat not installed")
+class TestSavWriter(unittest.TestCase):
+    def setUp(self):
+        self.columns = [
+            IntColumn("a1⛱"),
+            DateTimeColumn("a 2"),
+            FloatColumn("a3"),
+            TextColumn("a4"),
+            DateColumn("a5"),
+            BooleanField("and"),
+        ]
+        self.rows = [
+            [1, datetime.datetime(2020, 9, 8, 12, 30, 1), 1.5, "♝", datetime.date(2020, 1, 2), True],
+            [74321, None, -3.0, "abc\n this is a really long string" * 100, None, False],
+            [None, datetime.datetime(2010, 5, 4), None, None, datetime.date(1582, 10, 14), None],
+        ]
+
+    def write(self, rows, widths=None, size_hint=None):
+        fo = io.BytesIO()
+        write_sav(ListTable(rows, self.columns, size_hint=size_hint), fo, widths=widths, batch_size=2)
+        return read_sav(fo.getvalue())
+
+    def test_dictionary(self):
+        names, labels, _, _ = self.write(self.rows)
+        self.assertEqual(names, ["a1", "a_2", "a3", "a4", "a5", "and_"])
+        self.assertEqual(labels, ["a1⛱", "a 2", "a3", "a4", "a5", "and"])
+
+    def test_values(self):
+        _, _, _, rows = self.write(self.rows, size_hint=3)
+        self.assertEqual(rows, [
+            [1, datetime.datetime(2020, 9, 8, 12, 30, 1), 1.5, "♝", datetime.date(2020, 1, 2), 1],
+            [74321, None, -3.0, "abc\n this is a really long string" * 100, None, 0],
+            [None, datetime.datetime(2010, 5, 4), None, "", datetime.date(1582, 10, 14), None],
+        ])
+
+    def test_unknown_size(self):
+        _, _, _, rows = self.write(self.rows)
+        self.assertEqual(len(rows), 3)
+
+    def test_widths(self):
+        # Strings are truncated to their width without splitting characters
+        widths = [None, None, None, 4, None, None]
+        _, _, _, rows = self.write([[1, None, None, "ab♝", None, None]], widths=widths)
+        self.assertEqual(rows[0][3], "ab")
+
+        widths = [None, None, None, 600, None, None]
+        _, _, _, rows = self.write([[1, None, None, "x" * 1000, None, None]], widths=widths)
+        self.assertEqual(rows[0][3], "x" * 600)
+
+    def test_infer_widths(self):
+        _, _, widths, _ = self.write(self.rows)
+        self.assertEqual(widths, [0, 0, 0, len(self.rows[1][3]), 0, 0])
+
+        # Non-string columns are stored as strings
+        self.columns = [UUIDColumn("a"), TextColumn("b")]
+        uuid1 = uuid.uuid4()
+        _, _, widths, rows = self.write([[uuid1, "♝"], [None, None]])
+        self.assertEqual(widths, [36, 3])
+        self.assertEqual(rows, [[str(uuid1), "♝"], ["", ""]])
+
+        # Empty columns
+        _, _, widths, _ = self.write([])
+        self.assertEqual(widths, [1, 1])
+
+    def test_unpicklable(self):
+        # Spooled rows hold converted strings, so values need not be picklable
+        self.columns = [ObjectColumn("a"), TextColumn("b")]
+        lock = threading.Lock()
+        _, _, widths, rows = self.write([[lock, "x"], [None, "y"]])
+        self.assertEqual(widths, [len(str(lock)), 1])
+        self.assertEqual(rows, [[str(lock), "x"], ["", "y"]])
+
+    def test_max_length(self):
+        self.columns = [TextColumn("a", max_length=3), TextColumn("b")]
+        _, _, widths, rows = self.write([["abcdef", "abcdef"]])
+        self.assertEqual(widths, [12, 6])
+        self.assertEqual(rows, [["abcdef", "abcdef"]])
+
+    def test_processes(self):
+        rows = self.rows * 10
+        table = ListTable(rows, self.columns)
+        data = SPSSExporter(batch_size=7, processes=2).dumps(table)
+        _, _, _, result = read_sav(data)
+        self.assertEqual(result, self.write(rows)[3])
+
+
+@unittest.skipUnless(shutil.which("pspp"), "PSPP not installed")
+class TestSavWriterPSPP(unittest.TestCase):
+    def test_read_with_pspp(self):
+        table = ListTable(
+            columns=[IntColumn("a1"), DateTimeColumn("a2"), FloatColumn("a3"), TextColumn("a4")],
+            rows=[
+                [1, datetime.datetime(2020, 9, 8), 1.0, "♝"],
+                [74321, datetime.datetime(2015, 7, 6), 3.0, "abc " * 1000],
+                [None, None, None, None],
+            ]
+        )
+
+        with tempfile.NamedTemporaryFile(suffix=".sav") as fo:
+            SPSSExporter().dump(table, fo)
+            fo.flush()
+
+            commands = b"get file='" + fo.name.encode("utf-8") + b"'.\nlist.\nshow n.\n"
+            pspp = subprocess.Popen(["pspp", "-b"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            stdout, _ = pspp.communicate(input=commands, timeout=30)
+
+        self.assertIn(b"N is 3.", stdout)
+        self.assertIn(b"08-SEP-2020 00:00:00", stdout)
+        self.assertIn(b"74321", stdout)
+        self.assertIn("♝".encode("utf-8"), stdout)
@@ -0,0 +1,112 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import unittest
+
+import pyexcel
+
+from exportable import columns
+from exportable.exporters import XLSXExporter, ODSExporter, XLSExporter, CSVExporter
+from exportable.exporters.spreadsheet import get_sheet_name, prepare_sheets
+from exportable.table import ListTable, Workbook
+
+
+class TestSheetSplitting(unittest.TestCase):
+    def get_table(self, n):
+        rows = ([i, str(i)] for i in range(n))
+        return ListTable(rows=rows, columns=[columns.IntColumn("a"), columns.TextColumn("b")])
+
+    def get_sheets(self, exporter, n):
+        data = exporter.dumps(self.get_table(n))
+        book = pyexcel.get_book(file_content=data, file_type=exporter.extension)
+        return [(sheet.name, sheet.to_array()) for sheet in book]
+
+    def test_split(self):
+        for exporter in (XLSXExporter(max_rows=3), ODSExporter(max_rows=3)):
+            self.assertEqual([
+                ("Sheet 1", [["a", "b"], [0, "0"], [1, "1"]]),
+                ("Sheet 1 (2)", [["a", "b"], [2, "2"], [3, "3"]]),
+                ("Sheet 1 (3)", [["a", "b"], [4, "4"]]),
+            ], self.get_sheets(exporter, 5), exporter)
+
+            self.assertEqual(2, len(self.get_sheets(exporter, 4)))
+            self.assertEqual([("Sheet 1", [["a", "b"]])], self.get_sheets(exporter, 0))
+
+    def test_invalid_max_rows(self):
+        for max_rows in (-1, 0, 1):
+            self.assertRaises(ValueError, XLSXExporter, max_rows=max_rows)
+            self.assertRaises(ValueError, ODSExporter, max_rows=max_rows)
+
+    def test_xls(self):
+        """Default limit of XLS (65536 rows) should be respected"""
+        sheets = self.get_sheets(XLSExporter(), 70000)
+        self.assertEqual(["Sheet 1", "Sheet 1 (2)"], [name for name, _ in sheets])
+        self.assertEqual(65536, len(sheets[0][1]))
+        self.assertEqual([["a", "b"], [65535, "65535"]], sheets[1][1][:2])
+
+    def test_get_sheet_name(self):
+        self.assertEqual("foo", get_sheet_name("foo", 1))
+        self.assertEqual("foo (12)", get_sheet_name("foo", 12))
+        self.assertEqual("a" * 26 + " (12)", get_sheet_name("a" * 40, 12))
+
+
+class TestWorkbook(unittest.TestCase):
+    def get_table(self, n):
+        return ListTable(rows=([i] for i in range(n)), columns=[columns.IntColumn("a")])
+
+    def get_workbook(self):
+        def rows(n):
+            for i in range(n):
+                yield [i]
+
+        return Workbook([
+            ("Articles", ListTable(rows=rows(3), columns=[columns.IntColumn("a")])),
+            ("Projects", ListTable(rows=iter([["x", 1]]), columns=[columns.TextColumn("b"), columns.IntColumn("c")])),
+            ("articles", ListTable(rows=rows(0), columns=[columns.IntColumn("d")])),
+        ])
+
+    def test_dump(self):
+        for extension in ("xlsx", "ods", "xls"):
+            data = self.get_workbook().dumps(extension)
+            book = pyexcel.get_book(file_content=data, file_type=extension)
+            self.assertEqual([
+                ("Articles", [["a"], [0], [1], [2]]),
+                ("Projects", [["b", "c"], ["x", 1]]),
+                ("articles_2", [["d"]]),
+            ], [(sheet.name, sheet.to_array()) for sheet in book], extension)
+
+    def test_split(self):
+        data = b"".join(XLSXExporter(max_rows=2).dump_iter(self.get_workbook()))
+        book = pyexcel.get_book(file_content=data, file_type="xlsx")
+        self.assertEqual(
+            ["Articles", "Articles (2)", "Articles (3)", "Projects", "articles_2"],
+            [sheet.name for sheet in book]
+        )
+
+    def test_unique_names(self):
+        """Renamed duplicates should not be confused with parts of split tables"""
+        tables = [("a", self.get_table(4)), ("A", self.get_table(4)), ("a (2)", self.get_table(1)), ("a:", self.get_table(0))]
+        names = []
+        for name, columns, rows in prepare_sheets(tables, max_rows=3):
+            list(rows)  # Sheets should be consumed before requesting the next
+            names.append(name)
+        self.assertEqual(["a", "a (2)", "A_2", "A_2 (2)", "a (2)_2", "a_"], names)
+
+    def test_unsupported(self):
+        self.assertRaises(TypeError, self.get_workbook().dumps, "csv")
+        self.assertRaises(TypeError, CSVExporter().dumps, self.get_workbook())
@@ -0,0 +1,71 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+import uuid
+
+from exportable.columns import IntColumn, FloatColumn, TextColumn, BooleanField, DateColumn, DateTimeColumn, UUIDColumn
+from exportable.exporters import SQLiteExporter
+from exportable.table import ListTable
+
+
+class TestSQLiteExporter(unittest.TestCase):
+    def setUp(self):
+        self.uuid = uuid.uuid4()
+        self.rows = [
+            [1, 1.5, "♝", True, datetime.date(2020, 1, 2), datetime.datetime(2020, 1, 2, 3, 4, 5), self.uuid],
+            [None, None, None, None, None, None, None],
+            [3, -1.0, 'a "quoted" value', False, datetime.date(1900, 1, 1), datetime.datetime(1970, 1, 1), self.uuid],
+        ]
+        self.table = ListTable(rows=self.rows, columns=[
+            IntColumn("i"), FloatColumn("f"), TextColumn("s s"), BooleanField("b"),
+            DateColumn("d"), DateTimeColumn("dt"), UUIDColumn("u")
+        ])
+
+    def connect(self, data):
+        fd, path = tempfile.mkstemp(suffix=".sqlite")
+        with os.fdopen(fd, "wb") as fo:
+            fo.write(data)
+        self.addCleanup(os.unlink, path)
+        db = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+        self.addCleanup(db.close)
+        return db
+
+    def test_values(self):
+        db = self.connect(SQLiteExporter(batch_size=2).dumps(self.table))
+        rows = db.execute('SELECT * FROM "data"').fetchall()
+        self.assertEqual(rows, [
+            (1, 1.5, "♝", True, datetime.date(2020, 1, 2), datetime.datetime(2020, 1, 2, 3, 4, 5), str(self.uuid)),
+            (None, None, None, None, None, None, None),
+            (3, -1.0, 'a "quoted" value', False, datetime.date(1900, 1, 1), datetime.datetime(1970, 1, 1), str(self.uuid)),
+        ])
+
+    def test_indexes(self):
+        db = self.connect(SQLiteExporter(table_name="articles", indexes=["i", "s s"]).dumps(self.table))
+        indexes = db.execute("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name").fetchall()
+        self.assertEqual(indexes, [("ix_articles_i",), ("ix_articles_s s",)])
+        self.assertEqual(db.execute('SELECT count(*) FROM "articles"').fetchone(), (3,))
+
+    def test_dump_iter(self):
+        exporter = SQLiteExporter()
+        db = self.connect(b"".join(exporter.dump_iter(self.table)))
+        self.assertEqual(db.execute('SELECT count(*) FROM "data"').fetchone(), (3,))
@@ -0,0 +1,76 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import datetime
+import io
+import unittest
+import uuid
+import zipfile
+
+import openpyxl
+
+from exportable import columns
+from exportable.exporters import XLSXExporter
+from exportable.exporters.xlsx import get_column_letter
+from exportable.table import ListTable
+
+
+class TestXLSXExporter(unittest.TestCase):
+    def get_table(self, rows):
+        return ListTable(rows=iter(rows), columns=[
+            columns.IntColumn("a", verbose_name="A <&>"),
+            columns.DateTimeColumn("b"),
+            columns.FloatColumn("c"),
+            columns.TextColumn("d"),
+            columns.DateColumn("e"),
+            columns.UUIDColumn("f"),
+            columns.BooleanField("g"),
+        ])
+
+    def test_dump(self):
+        test_uuid = uuid.uuid4()
+        rows = [
+            [1, datetime.datetime(2020, 9, 8, 12, 11, 10), 1.5, "♝ <b>\x01", datetime.date(2020, 1, 2), test_uuid, True],
+            [None, None, None, None, None, None, False],
+        ]
+
+        data = self.get_table(rows).dumps("xlsx")
+        sheet = openpyxl.load_workbook(io.BytesIO(data)).active
+        self.assertEqual("Sheet 1", sheet.title)
+        self.assertEqual([
+            ("A <&>", "b", "c", "d", "e", "f", "g"),
+            (1, datetime.datetime(2020, 9, 8, 12, 11, 10), 1.5, "♝ <b>", datetime.datetime(2020, 1, 2), str(test_uuid), True),
+            (None, None, None, None, None, None, False),
+        ], list(sheet.values))
+
+    def test_dump_iter(self):
+        rows = [[i, None, i / 3, str(i), None, None, None] for i in range(5000)]
+        data = b"".join(XLSXExporter(batch_size=100).dump_iter(self.get_table(rows)))
+        info = zipfile.ZipFile(io.BytesIO(data)).infolist()[0]
+        self.assertEqual("xl/worksheets/sheet1.xml", info.filename)
+
+        # Sheets are streamed, so their size is not known in advance. They should be written with
+        # ZIP64 extensions, or sheets over 2 GiB would fail.
+        self.assertEqual(zipfile.ZIP64_VERSION, info.extract_version)
+
+        sheet = openpyxl.load_workbook(io.BytesIO(data)).active
+        self.assertEqual(5001, sheet.max_row)
+        self.assertEqual((4999, None, 4999 / 3, "4999"), next(sheet.iter_rows(min_row=5001, values_only=True))[:4])
+
+    def test_get_column_letter(self):
+        self.assertEqual(["A", "Z", "AA", "AZ", "BA", "ZZ", "AAA"], [get_column_letter(i) for i in (0, 25, 26, 51, 52, 701, 702)])
@@ -0,0 +1,205 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+Native XLSX writer. Instead of building a workbook in memory, worksheets are written row by row
+into a (deflated) zip entry, making it possible to export tables of any size in constant memory.
+Strings are written inline, so no shared strings table needs to be kept around.
+"""
+import datetime
+import itertools
+import math
+import zipfile
+from xml.sax.saxutils import quoteattr
+
+from exportable.exporters.base import convert_batch
+from exportable.exporters.parallel import chunks
+from exportable.exporters.spreadsheet import SpreadsheetExporter, to_xml_text
+
+# Excel refuses cells with more characters than this
+MAX_CELL_LENGTH = 32767
+
+# Excel stores dates as the number of days since 30-12-1899
+EXCEL_EPOCH = datetime.date(1899, 12, 30).toordinal()
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+CONTENT_TYPES = XML_HEADER + """\
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">\
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>\
+<Default Extension="xml" ContentType="application/xml"/>\
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>\
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>\
+{sheets}</Types>"""
+
+CONTENT_TYPE_SHEET = """\
+<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>"""
+
+ROOT_RELS = XML_HEADER + """\
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">\
+<Relationship Id="rId1" Type="{rel_ns}/officeDocument" Target="xl/workbook.xml"/>\
+</Relationships>""".format(rel_ns=REL_NS)
+
+WORKBOOK = XML_HEADER + """\
+<workbook xmlns="{main_ns}" xmlns:r="{rel_ns}"><sheets>{{sheets}}</sheets></workbook>""".format(main_ns=MAIN_NS, rel_ns=REL_NS)
+
+WORKBOOK_SHEET = '<sheet name={name} sheetId="{n}" r:id="rId{n}"/>'
+
+WORKBOOK_RELS = XML_HEADER + """\
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">\
+{sheets}<Relationship Id="rIdStyles" Type="{rel_ns}/styles" Target="styles.xml"/>\
+</Relationships>"""
+
+WORKBOOK_RELS_SHEET = '<Relationship Id="rId{n}" Type="{rel_ns}/worksheet" Target="worksheets/sheet{n}.xml"/>'
+
+# Cell style 1 is used for datetimes, 2 for dates
+STYLES = XML_HEADER + """\
+<styleSheet xmlns="{main_ns}">\
+<numFmts count="2">\
+<numFmt numFmtId="164" formatCode="yyyy\\-mm\\-dd\\ hh:mm:ss"/>\
+<numFmt numFmtId="165" formatCode="yyyy\\-mm\\-dd"/>\
+</numFmts>\
+<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>\
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>\
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>\
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>\
+<cellXfs count="3">\
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>\
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>\
+<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>\
+</cellXfs>\
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>\
+</styleSheet>""".format(main_ns=MAIN_NS)
+
+SHEET_START = XML_HEADER + '<worksheet xmlns="{main_ns}"><sheetData>'.format(main_ns=MAIN_NS)
+SHEET_END = '</sheetData></worksheet>'
+
+
+def get_column_letter(index):
+    """Return Excel column name (A, B, .., AA, AB, ..) for zero-based index."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def text_cell(ref, value):
+    text = to_xml_text(value[:MAX_CELL_LENGTH])
+    return '<c r="{}" t="inlineStr"><is><t xml:space="preserve">{}</t></is></c>'.format(ref, text)
+
+
+def int_cell(ref, value):
+    return '<c r="{}"><v>{}</v></c>'.format(ref, int(value))
+
+
+def float_cell(ref, value):
+    if math.isfinite(value):
+        return '<c r="{}"><v>{!r}</v></c>'.format(ref, value)
+    return text_cell(ref, str(value))
+
+
+def bool_cell(ref, value):
+    return '<c r="{}" t="b"><v>{}</v></c>'.format(ref, int(value))
+
+
+def datetime_cell(ref, value: datetime.datetime):
+    seconds = value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+    return '<c r="{}" s="1"><v>{!r}</v></c>'.format(ref, value.toordinal() - EXCEL_EPOCH + seconds / 86400)
+
+
+def date_cell(ref, value: datetime.date):
+    return '<c r="{}" s="2"><v>{}</v></c>'.format(ref, value.toordinal() - EXCEL_EPOCH)
+
+
+CELL_WRITERS = {
+    str: text_cell,
+    int: int_cell,
+    float: float_cell,
+    bool: bool_cell,
+    datetime.datetime: datetime_cell,
+    datetime.date: date_cell,
+}
+
+
+class XLSXExporter(SpreadsheetExporter):
+    extension = "xlsx"
+    content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    max_rows = 1048576
+
+    def write_sheets(self, zf, sheets):
+        names = []
+        for n, (name, columns, rows) in enumerate(sheets, start=1):
+            self.write_sheet(zf, n, columns, rows)
+            names.append(name)
+        self.write_workbook(zf, names)
+
+    def write_rows(self, columns, rows, start=1, convert=True):
+        """Yield XML of rows in batches, starting at row number start. If convert is False (for
+        headers), values are not converted by their column."""
+        letters = [get_column_letter(i) for i in range(len(columns))]
+        to_strs = [column.to_str for column in columns]
+        row_numbers = map(str, itertools.count(start))
+
+        # Columns without a native cell type are converted to text a batch at a time
+        converters = [None if column.type in CELL_WRITERS else column.to_str_many for column in columns]
+
+        for batch in chunks(rows, self.batch_size):
+            if convert:
+                batch = convert_batch(converters, batch)
+            xml = []
+            for row, n in zip(batch, row_numbers):
+                xml.append('<row r="{}">'.format(n))
+                for letter, to_str, value in zip(letters, to_strs, row):
+                    if value is not None:
+                        # Values of types without a native cell type are written as text
+                        cell_writer = CELL_WRITERS.get(type(value))
+                        if cell_writer is None:
+                            xml.append(text_cell(letter + n, to_str(value)))
+                        else:
+                            xml.append(cell_writer(letter + n, value))
+                xml.append('</row>')
+            yield "".join(xml)
+
+    def write_sheet(self, zf: zipfile.ZipFile, n, columns, rows):
+        header = [[str(column.verbose_name) for column in columns]]
+
+        with zf.open("xl/worksheets/sheet{}.xml".format(n), "w", force_zip64=True) as sheet:
+            sheet.write(SHEET_START.encode())
+            for xml in self.write_rows(columns, header, convert=False):
+                sheet.write(xml.encode())
+            for xml in self.write_rows(columns, rows, start=2):
+                sheet.write(xml.encode())
+            sheet.write(SHEET_END.encode())
+
+    def write_workbook(self, zf: zipfile.ZipFile, names):
+        """Write all parts of an XLSX file except worksheets"""
+        numbers = range(1, len(names) + 1)
+        sheets = "".join(WORKBOOK_SHEET.format(name=quoteattr(name), n=n) for n, name in zip(numbers, names))
+        zf.writestr("xl/workbook.xml", WORKBOOK.format(sheets=sheets))
+
+        rels = "".join(WORKBOOK_RELS_SHEET.format(n=n, rel_ns=REL_NS) for n in numbers)
+        zf.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS.format(sheets=rels, rel_ns=REL_NS))
+
+        content_types = "".join(CONTENT_TYPE_SHEET.format(n=n) for n in numbers)
+        zf.writestr("[Content_Types].xml", CONTENT_TYPES.format(sheets=content_types))
+        zf.writestr("_rels/.rels", ROOT_RELS)
+        zf.writestr("xl/styles.xml", STYLES)
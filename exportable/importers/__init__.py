@@ -0,0 +1,46 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+from exportable.importers.base import Importer
+from exportable.importers.csv import CSVImporter, TSVImporter
+from exportable.importers.json import JSONImporter, NDJSONImporter
+
+DEFAULT_IMPORTERS = [
+    JSONImporter,
+    NDJSONImporter,
+    CSVImporter,
+    TSVImporter
+]
+
+
+def get_importer_by_extension(extension):
+    for importer in DEFAULT_IMPORTERS:
+        if importer.extension == extension:
+            return importer
+    raise ValueError("No importer with extension {} in DEFAULT_IMPORTERS.".format(extension))
+
+
+def load(fo, importer, columns=None, encoding_hint="utf-8"):
+    """Read a lazy table from file like object fo.
+
+    @param importer: importer instance or extension (such as "csv")
+    @param columns: columns to import. Defaults to all fields as text.
+    """
+    if isinstance(importer, str):
+        importer = get_importer_by_extension(importer)()
+    return importer.load(fo, columns=columns, encoding_hint=encoding_hint)
@@ -0,0 +1,130 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import copy
+import functools
+import io
+import itertools
+from operator import itemgetter
+
+from exportable.columns import Column, TextColumn
+from exportable.table import ListTable
+
+
+def parse_values(from_str, values):
+    # Empty fields are how text formats write None
+    return [from_str(value) if value else None for value in values]
+
+
+def text_values(values):
+    return [value or None for value in values]
+
+
+def get_converter(column):
+    """Return function converting a batch of strings to values of this column. Plain text
+    columns only need empty strings to be replaced by None, so skip from_str() altogether."""
+    if column.type is str and type(column).from_str is Column.from_str:
+        return text_values
+    return functools.partial(parse_values, column.from_str)
+
+
+def convert_batches(converters, rows, batch_size):
+    """Convert rows in batches of batch_size rows, column by column."""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        values = [convert(values) for convert, values in zip(converters, zip(*batch))]
+        yield from zip(*values)
+
+
+def get_fields(labels, columns):
+    """Return a function picking the values of columns from a row with given labels."""
+    try:
+        indices = [labels.index(column.label) for column in columns]
+    except ValueError:
+        missing = [c.label for c in columns if c.label not in labels]
+        raise ValueError("Columns {} not found in {}".format(missing, labels))
+
+    if not indices:
+        return lambda row: ()
+    elif len(indices) == 1:
+        index = indices[0]
+        return lambda row: (row[index],)
+    return itemgetter(*indices)
+
+
+def to_table(rows, labels, columns=None, batch_size=1000, get_converter=get_converter):
+    """Build a lazy ListTable from rows of strings (or native values).
+
+    @param rows: rows with values ordered by labels
+    @param labels: labels of fields in rows
+    @param columns: columns to import. Their labels are matched to labels, and their from_str is
+                    used to convert values. If None, import all fields as text.
+    @param get_converter: function returning a batch converter for a column
+    """
+    if columns is None:
+        columns = [TextColumn(label) for label in labels]
+    else:
+        columns = [copy.copy(column) for column in columns]
+        for column in columns:
+            # Values are already extracted by the importer
+            column.rowfunc = None
+            column.cellfunc = None
+
+    fields = get_fields(list(labels), columns)
+    converters = list(map(get_converter, columns))
+    rows = convert_batches(converters, map(fields, rows), batch_size)
+    return ListTable(rows=rows, columns=columns)
+
+
+def to_text(fo, encoding):
+    """Return text stream for fo, which might either be a binary or a text file."""
+    if isinstance(fo, io.TextIOBase):
+        return fo
+    return io.TextIOWrapper(fo, encoding=encoding, newline="")
+
+
+class Importer(object):
+    """
+    Importers read a file in some format and turn it into a lazy table. Subclasses only need to
+    implement Importer.load(). As tables are lazy, the file object needs to stay open until the
+    rows of the table have been consumed.
+    """
+    extension = None
+
+    def __init__(self, batch_size=1000):
+        """
+        @param batch_size: number of rows converted at once
+        """
+        self.batch_size = batch_size
+
+    def load(self, fo, columns=None, encoding_hint="utf-8") -> ListTable:
+        """Read table from file like object.
+
+        @param fo: file like object (binary or text)
+        @param columns: columns to import. Columns are matched to fields in the file by label,
+                        and their values are converted using Column.from_str.
+        @param encoding_hint: encoding of fo if it is a binary file
+        """
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def loads(self, data: bytes, columns=None, encoding_hint="utf-8") -> ListTable:
+        """Read table from bytes. See Importer.load()."""
+        return self.load(io.BytesIO(data), columns=columns, encoding_hint=encoding_hint)
@@ -0,0 +1,47 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import csv
+
+from exportable.importers.base import Importer, to_table, to_text
+
+
+class CSVImporter(Importer):
+    extension = "csv"
+
+    def __init__(self, dialect="excel", batch_size=1000, **fmtparams):
+        """
+        @param dialect: csv dialect (name or class) passed to csv.reader
+        @param batch_size: number of rows converted at once
+        @param fmtparams: formatting parameters overriding those of dialect
+        """
+        super().__init__(batch_size=batch_size)
+        self.dialect = dialect
+        self.fmtparams = fmtparams
+
+    def load(self, fo, columns=None, encoding_hint="utf-8"):
+        reader = csv.reader(to_text(fo, encoding_hint), dialect=self.dialect, **self.fmtparams)
+        labels = next(reader, [])
+        return to_table(reader, labels, columns, batch_size=self.batch_size)
+
+
+class TSVImporter(CSVImporter):
+    extension = "tsv"
+
+    def __init__(self, dialect="excel-tab", **kwargs):
+        super().__init__(dialect=dialect, **kwargs)
@@ -0,0 +1,142 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import functools
+import itertools
+import json
+import re
+
+from exportable.columns import TextColumn, IntColumn, FloatColumn
+from exportable.importers.base import Importer, to_table, to_text
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+NATIVE_COLUMNS = {
+    int: IntColumn,
+    float: FloatColumn,
+    str: TextColumn,
+}
+
+
+# Partial tokens (literals, numbers, \\uXXXX escapes) at the end of a buffer are never longer than
+# this, so decoding errors before them are not caused by the buffer being cut off
+MAX_PARTIAL_TOKEN = 8
+
+
+def native_values(values):
+    return values
+
+
+def parse_values(ctype, from_str, values):
+    return [value if value is None or isinstance(value, ctype) else from_str(value) for value in values]
+
+
+def get_converter(column):
+    """Values of JSON native types do not need conversion, while others (dates, etc.) are
+    stored as strings. Values which already have the type of the column (such as booleans) are
+    passed as-is."""
+    if column.type in (int, float, str):
+        return native_values
+    return functools.partial(parse_values, column.type, column.from_str)
+
+
+def is_cut_off(error: json.JSONDecodeError, buffer):
+    """Return whether decoding failed because the buffer ended, instead of invalid JSON."""
+    return error.pos >= len(buffer) - MAX_PARTIAL_TOKEN or error.msg.startswith("Unterminated string")
+
+
+def iter_values(fp, chunk_size=64*1024):
+    """Yield objects from a JSON array or from newline delimited JSON (NDJSON), without reading
+    the whole document in memory."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    array = None
+
+    while True:
+        pos = WHITESPACE.match(buffer, pos).end()
+
+        if array is None and pos < len(buffer):
+            # First character decides whether we're reading an array or NDJSON
+            array = buffer[pos] == "["
+            pos += array
+            continue
+        elif array and buffer.startswith(",", pos):
+            pos += 1
+            continue
+        elif array and buffer.startswith("]", pos):
+            return
+        elif pos < len(buffer):
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof or not is_cut_off(e, buffer):
+                    raise
+            else:
+                # Values ending at the end of the buffer (numbers, literals) might continue in the
+                # next chunk. Others were terminated by the character at end.
+                if end < len(buffer) or eof:
+                    yield value
+                    pos = end
+                    continue
+        elif eof:
+            if array:
+                raise ValueError("Expected ']' at end of JSON document")
+            return
+
+        # Read more data, discarding what we have already parsed
+        chunk = fp.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+
+def get_column(label, value):
+    return NATIVE_COLUMNS.get(type(value), TextColumn)(label)
+
+
+class JSONImporter(Importer):
+    """
+    Imports JSON arrays of objects, as written by JSONExporter, and newline delimited JSON. If no
+    columns are given, they are deduced from the first object.
+    """
+    extension = "json"
+
+    def __init__(self, batch_size=1000, chunk_size=64*1024):
+        """
+        @param batch_size: number of rows converted at once
+        @param chunk_size: number of characters read from file at once
+        """
+        super().__init__(batch_size=batch_size)
+        self.chunk_size = chunk_size
+
+    def load(self, fo, columns=None, encoding_hint="utf-8"):
+        objects = iter_values(to_text(fo, encoding_hint), chunk_size=self.chunk_size)
+
+        # Peek at first object to determine labels
+        first = next(objects, {})
+        objects = itertools.chain([first], objects) if first else objects
+
+        if columns is None:
+            columns = [get_column(label, value) for label, value in first.items()]
+
+        labels = [column.label for column in columns]
+        rows = ([obj.get(label) for label in labels] for obj in objects)
+        return to_table(rows, labels, columns, batch_size=self.batch_size, get_converter=get_converter)
+
+
+class NDJSONImporter(JSONImporter):
+    extension = "jsonl"
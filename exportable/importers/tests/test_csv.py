@@ -0,0 +1,74 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import datetime
+import io
+import unittest
+import uuid
+
+from exportable import columns
+from exportable.importers import CSVImporter, TSVImporter, load
+from exportable.table import ListTable
+
+
+class TestCSVImporter(unittest.TestCase):
+    def setUp(self):
+        self.columns = [
+            columns.IntColumn("a"),
+            columns.DateTimeColumn("b"),
+            columns.FloatColumn("c"),
+            columns.TextColumn("d"),
+        ]
+        self.rows = [
+            [None,  datetime.datetime(2020, 9, 8, 12, 11, 10), 1.5,  "♝"],
+            [74321, None,                                      3.0,  "a,\"b\"\nc"],
+            [5,     datetime.datetime(2010, 5, 4),             None, None]
+        ]
+
+    def test_roundtrip(self):
+        data = ListTable(rows=self.rows, columns=self.columns).dumps("csv")
+        table = CSVImporter(batch_size=2).loads(data, columns=self.columns)
+        self.assertTrue(table.lazy)
+        self.assertEqual(self.rows, list(table.rows))
+
+    def test_empty_fields(self):
+        """Empty fields are None, also for columns whose from_str() rejects empty strings"""
+        cols = [columns.IntColumn("a"), columns.UUIDColumn("u")]
+        rows = [[1, None], [None, uuid.UUID(int=5)]]
+        data = ListTable(rows=rows, columns=cols).dumps("csv")
+        self.assertEqual(rows, list(CSVImporter().loads(data, columns=cols).rows))
+
+    def test_tsv(self):
+        data = ListTable(rows=self.rows, columns=self.columns).dumps("tsv", encoding_hint="utf-16")
+        table = TSVImporter().loads(data, columns=self.columns, encoding_hint="utf-16")
+        self.assertEqual(self.rows, list(table.rows))
+
+    def test_select_columns(self):
+        """Columns are matched by label, not by position"""
+        table = load(io.BytesIO(b"a,b,c\r\n1,2,3\r\n4,5,6\r\n"), "csv", columns=[columns.IntColumn("c"), columns.IntColumn("a")])
+        self.assertEqual([[3, 1], [6, 4]], list(table.rows))
+        self.assertEqual(["c", "a"], [c.label for c in table.columns])
+
+        loader = CSVImporter()
+        self.assertRaises(ValueError, loader.loads, b"a,b\r\n", columns=[columns.IntColumn("x")])
+
+    def test_text(self):
+        """Without columns, fields are imported as text"""
+        table = CSVImporter().load(io.StringIO("a,b\r\n1,\r\n"))
+        self.assertEqual([str, str], [c.type for c in table.columns])
+        self.assertEqual([["1", None]], list(table.rows))
@@ -0,0 +1,82 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import datetime
+import io
+import unittest
+
+from exportable import columns
+from exportable.importers import JSONImporter, NDJSONImporter
+from exportable.importers.json import iter_values
+from exportable.table import ListTable
+
+
+class TestJSONImporter(unittest.TestCase):
+    def test_roundtrip(self):
+        cols = [
+            columns.IntColumn("a"),
+            columns.DateTimeColumn("b"),
+            columns.FloatColumn("c"),
+            columns.TextColumn("d"),
+        ]
+        rows = [
+            [None,  datetime.datetime(2020, 9, 8, 12, 11, 10), 1.5,  "♝"],
+            [74321, None,                                      0.0,  ""],
+            [0,     datetime.datetime(2010, 5, 4),             None, None]
+        ]
+
+        data = ListTable(rows=rows, columns=cols).dumps("json")
+        table = JSONImporter(batch_size=2, chunk_size=10).loads(data, columns=cols)
+        self.assertEqual(rows, list(table.rows))
+
+    def test_infer_columns(self):
+        table = JSONImporter().loads(b'[{"a": 1, "b": 1.5, "c": "x", "d": null}, {"a": 2}]')
+        self.assertEqual([int, float, str, str], [c.type for c in table.columns])
+        self.assertEqual([[1, 1.5, "x", None], [2, None, None, None]], list(table.rows))
+
+    def test_ndjson(self):
+        table = NDJSONImporter().loads(b'{"a": 1}\n{"a": 2}\n\n{"a": 3}\n')
+        self.assertEqual([[1], [2], [3]], list(table.rows))
+
+    def test_empty(self):
+        self.assertEqual([], list(JSONImporter().loads(b"[]").rows))
+        self.assertEqual([], list(JSONImporter().loads(b"").rows))
+        self.assertRaises(ValueError, list, JSONImporter().loads(b'[{"a": 1}').rows)
+
+    def test_native_types(self):
+        """Values which already have the type of their column should not be parsed"""
+        cols = [columns.BooleanField("a"), columns.NullBooleanField("b"), columns.DateColumn("c")]
+        data = b'[{"a": true, "b": "no", "c": "2020-01-02"}, {"a": "false", "b": null, "c": null}]'
+        table = JSONImporter().loads(data, columns=cols)
+        self.assertEqual([[True, False, datetime.date(2020, 1, 2)], [False, None, None]], list(table.rows))
+
+    def test_chunk_boundaries(self):
+        """Values cut off at any position by the end of a chunk should be read in full"""
+        data = b'[{"a": 12345, "b": true, "c": "\\ud83d\\ude00x", "d": -1.5e-7}, {"a": null, "b": false, "d": 100}]\n'
+        expected = list(JSONImporter().loads(data).rows)
+        for chunk_size in range(1, len(data)):
+            self.assertEqual(expected, list(JSONImporter(chunk_size=chunk_size).loads(data).rows), chunk_size)
+
+        ndjson = b'1\n23\n{"a": 456}\n7'
+        for chunk_size in range(1, len(ndjson)):
+            values = list(iter_values(io.StringIO(ndjson.decode()), chunk_size=chunk_size))
+            self.assertEqual([1, 23, {"a": 456}, 7], values, chunk_size)
+
+    def test_invalid(self):
+        data = b'[{"a": 1}, {"a" 2}, ' + b'{"a": 3}, ' * 10000 + b'{"a": 4}]'
+        self.assertRaises(ValueError, list, JSONImporter(chunk_size=50).loads(data).rows)
@@ -0,0 +1,83 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+Helpers for table wrappers which might need more memory than they are allowed to use. Records
+are pickled in batches to temporary files, optionally partitioned by the hash of a key, so each
+partition can be processed on its own later.
+"""
+import pickle
+import tempfile
+
+
+class SpillFile(object):
+    """Temporary file holding pickled records, written and read in batches"""
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.file = tempfile.TemporaryFile()
+        self.buffer = []
+        self.size = 0
+
+    def append(self, record):
+        self.buffer.append(record)
+        self.size += 1
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            pickle.dump(self.buffer, self.file, pickle.HIGHEST_PROTOCOL)
+            self.buffer = []
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        """Iterate over all records, after which the file is closed"""
+        self.flush()
+        self.file.seek(0)
+        with self.file:
+            while True:
+                try:
+                    batch = pickle.load(self.file)
+                except EOFError:
+                    return
+                yield from batch
+
+
+class SpillPartitions(object):
+    """Records partitioned over a number of spill files by the hash of their key"""
+    def __init__(self, partitions=16, batch_size=1000, seed=0):
+        """
+        @param seed: mixed into hashes, so partitions can be partitioned again with another seed
+        """
+        self.files = [SpillFile(batch_size) for _ in range(partitions)]
+        self.seed = seed
+
+    def partition(self, key):
+        return hash((self.seed, key)) % len(self.files)
+
+    def append(self, key, record):
+        self.files[self.partition(key)].append(record)
+
+    def __len__(self):
+        return sum(map(len, self.files))
+
+    def __iter__(self):
+        """Iterate over partitions, each an iterable of records"""
+        return iter(self.files)
@@ -0,0 +1,164 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+"""
+Column statistics collected while a table is exported. Wrap a table in a StatisticsTable and
+export it as usual; statistics are gathered in the same pass over the rows:
+
+>>> table = StatisticsTable(ListTable(rows, columns))
+>>> table.dump(open("export.csv", "wb"), "csv")
+>>> table.statistics["title"].max_length
+>>> 120
+"""
+import math
+
+from exportable.columns import Column
+from exportable.exporters.parallel import chunks
+from exportable.table import WrappedTable
+
+MASK64 = 2**64 - 1
+
+
+def mix64(h):
+    """Spread the bits of a hash over 64 bits (splitmix64 finalizer). Python hashes of small
+    integers are the integers themselves, which would make poor HyperLogLog input."""
+    h &= MASK64
+    h = ((h ^ (h >> 30)) * 0xbf58476d1ce4e5b9) & MASK64
+    h = ((h ^ (h >> 27)) * 0x94d049bb133111eb) & MASK64
+    return h ^ (h >> 31)
+
+
+class HyperLogLog(object):
+    """Estimates the number of distinct (hashable) values using a fixed amount of memory. The
+    standard error is about 1.04 / sqrt(2 ** precision), so 1.6% for the default precision.
+
+    Values are hashed with hash(), so estimates of separate processes cannot be merged."""
+    def __init__(self, precision=12):
+        """
+        @param precision: use 2 ** precision registers (of one byte each)
+        """
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add_many(self, values):
+        p, registers = self.precision, self.registers
+        bits = 64 - p
+        mask = (1 << bits) - 1
+        for value in values:
+            h = mix64(hash(value))
+            index = h >> bits
+            rank = bits - (h & mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def add(self, value):
+        self.add_many((value,))
+
+    def __len__(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        # Small range correction (linear counting)
+        zeros = self.registers.count(0)
+        if zeros and estimate <= 2.5 * m:
+            estimate = m * math.log(m / zeros)
+
+        return int(round(estimate))
+
+
+class ColumnStatistics(object):
+    """Statistics of the values of a single column"""
+    def __init__(self, column: Column, precision=12):
+        """
+        @param precision: precision of the distinct count estimate (see HyperLogLog)
+        """
+        self.column = column
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.max_length = 0 if column.type is str else None
+        self.distinct_values = HyperLogLog(precision)
+
+        # Set to False once we encounter values which cannot be compared
+        self.orderable = True
+
+    @property
+    def distinct(self):
+        """Estimated number of distinct (non-null) values, or None if values are unhashable"""
+        return None if self.distinct_values is None else len(self.distinct_values)
+
+    def update(self, values):
+        """Update statistics with a batch of values of this column"""
+        non_null = [value for value in values if value is not None]
+        self.count += len(values)
+        self.nulls += len(values) - len(non_null)
+        if not non_null:
+            return
+
+        if self.orderable:
+            try:
+                low, high = min(non_null), max(non_null)
+                self.min = low if self.min is None else min(self.min, low)
+                self.max = high if self.max is None else max(self.max, high)
+            except TypeError:
+                self.orderable = False
+                self.min = self.max = None
+
+        if self.distinct_values is not None:
+            try:
+                self.distinct_values.add_many(non_null)
+            except TypeError:
+                # Unhashable values
+                self.distinct_values = None
+
+        if self.max_length is not None:
+            # Characters take at most four bytes, so only encode if the maximum might change
+            longest = max(len(value) for value in non_null)
+            if longest * 4 > self.max_length:
+                self.max_length = max(self.max_length, max(len(value.encode("utf-8")) for value in non_null))
+
+    def __repr__(self):
+        return "<ColumnStatistics(label={}, count={}, nulls={})>".format(self.column.label, self.count, self.nulls)
+
+
+class StatisticsTable(WrappedTable):
+    """Collects statistics of each column while the rows of the wrapped table are consumed, for
+    example by an exporter. Statistics are complete once all rows have been read."""
+    def __init__(self, table, batch_size=1000, precision=12):
+        """
+        @param table: table to wrap
+        @param batch_size: number of rows statistics are updated with at once
+        @param precision: precision of distinct count estimates (see HyperLogLog)
+        """
+        super().__init__(table)
+        self.batch_size = batch_size
+        self.column_statistics = [ColumnStatistics(column, precision) for column in table.columns]
+
+    @property
+    def statistics(self):
+        """Mapping of column labels to ColumnStatistics"""
+        return {stats.column.label: stats for stats in self.column_statistics}
+
+    @property
+    def rows(self):
+        for chunk in chunks(self.table.rows, self.batch_size):
+            for stats, values in zip(self.column_statistics, zip(*chunk)):
+                stats.update(values)
+            yield from chunk
@@ -16,14 +16,21 @@
 # You should have received a copy of the GNU Affero General Public        #
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
+import collections
 import copy
 import datetime
 import functools
+import heapq
 import itertools
+import queue
+import threading
 from operator import itemgetter, attrgetter
 
-from typing import Iterable, Any, Sequence, Optional, Container
-from exportable.columns import Column
+from typing import Iterable, Any, Sequence, Optional, Container, Mapping
+from exportable.columns import Column, IntColumn, FloatColumn
+from exportable.compiler import get_row_getter
+from exportable.bloom import BloomFilter
+from exportable.spill import SpillPartitions
 
 
 def get_exporter(exporter):
@@ -78,7 +85,12 @@ class Table:
 
     @property
     def rows(self):
-        return ([self.get_value(row, column) for column in self.columns] for row in self._rows)
+        if type(self).get_value is not Table.get_value:
+            return ([self.get_value(row, column) for column in self.columns] for row in self._rows)
+
+        # Extract all values of a row with a single (generated) function call
+        get_row = get_row_getter(tuple((column.rowfunc, column.cellfunc) for column in self.columns))
+        return map(get_row, self._rows)
 
     def get_value(self, row, column: Column):
         cfunc = column.cellfunc
@@ -172,6 +184,10 @@ class WrappedTable:
     def __getattr__(self, name):
         return getattr(self.table, name)
 
+    # Defined here (instead of proxied), so exporters are given the wrapper, not the wrapped table
+    dump = Table.dump
+    dumps = Table.dumps
+
 
 class SortedTable(WrappedTable):
     """A sorted table sorts its rows according to a user defined function."""
@@ -192,6 +208,572 @@ class SortedTable(WrappedTable):
         return sorted(self.table.rows, key=self.key, reverse=self.reverse)
 
 
+def _add(a, b):
+    return b if a is None else a if b is None else a + b
+
+
+def _min(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+def _add_pairs(a, b):
+    return a[0] + b[0], a[1] + b[1]
+
+
+def _mean(state):
+    total, count = state
+    return total / count if count else None
+
+
+# Aggregate functions: (initial state, step (state, value), merge (state, state), result (state)).
+# Steps are not called for None values, except for counts of rows (count without a column).
+AGGREGATES = {
+    "count": (0, lambda s, v: s + 1, int.__add__, None),
+    "sum": (None, _add, _add, None),
+    "min": (None, _min, _min, None),
+    "max": (None, _max, _max, None),
+    "mean": ((0, 0), lambda s, v: (s[0] + v, s[1] + 1), _add_pairs, _mean),
+}
+
+
+def _output_column(template: Column, label, index, verbose_name=None):
+    """Copy template as a column of a list of values, at index. If it is given another label, its
+    verbose name is kept, unless it defaulted to the label or another one is given."""
+    column = copy.copy(template)
+    if label != template.label:
+        if template.verbose_name == template.label:
+            column.verbose_name = label
+        column.label = label
+    if verbose_name is not None:
+        column.verbose_name = verbose_name
+    column.rowfunc = itemgetter(index)
+    column.cellfunc = None
+    return column
+
+
+class GroupedTable(WrappedTable):
+    """
+    Groups rows of a table by one or more columns, and computes aggregates of each group in a
+    single pass using a hash table. Groups are yielded in order of their first row.
+
+    >>> table = GroupedTable(articles, by=["medium", "week"], aggregates=[
+    >>>     ("n", "count", None),
+    >>>     ("words", "sum", "length"),
+    >>>     ("first", "min", "date"),
+    >>> ])
+
+    If more than max_groups groups are found, partial aggregates are spilled to temporary files,
+    partitioned by group. Partitions are aggregated one after another, so in that case groups
+    are not yielded in any particular order. Partitions which still contain more than max_groups
+    groups are partitioned again, up to max_depth times. Group values and aggregates must be
+    picklable.
+
+    Without columns to group by, a single row is yielded, even if the table is empty.
+    """
+    def __init__(self, table: Table, by: Sequence[str], aggregates: Sequence, max_groups=None, partitions=16, max_depth=3):
+        """
+        @param table: table to wrap
+        @param by: labels of columns to group by
+        @param aggregates: list of (label, function, column label) tuples. Function is one of
+                           count, sum, min, max or mean. Aggregates ignore None values. The column
+                           label of count can be None, to count rows.
+        @param max_groups: maximum number of groups to keep in memory, or None for no limit
+        @param partitions: number of temporary files to spill to if max_groups is exceeded
+        @param max_depth: maximum number of times to partition partitions exceeding max_groups
+        """
+        super().__init__(table)
+        columns = list(table.columns)
+        indices = {column.label: i for i, column in enumerate(columns)}
+
+        self.key_indices = [indices[label] for label in by]
+        self.aggregates = []
+        self.columns = [_output_column(columns[i], columns[i].label, n) for n, i in enumerate(self.key_indices)]
+
+        for n, (label, function, column_label) in enumerate(aggregates, start=len(self.columns)):
+            if function not in AGGREGATES:
+                raise ValueError("Unknown aggregate function: {!r}".format(function))
+            if column_label is None and function != "count":
+                raise ValueError("Aggregate {!r} needs a column".format(function))
+
+            index = None if column_label is None else indices[column_label]
+            self.aggregates.append((AGGREGATES[function], index))
+
+            if function == "count":
+                template = IntColumn()
+            elif function == "mean":
+                template = FloatColumn()
+            else:
+                template = columns[index]
+            self.columns.append(_output_column(template, label, n, verbose_name=label))
+
+        self.size_hint = None
+        self.max_groups = max_groups
+        self.partitions = partitions
+        self.max_depth = max_depth
+
+    def _get_key(self, row):
+        return tuple([row[i] for i in self.key_indices])
+
+    def _new_state(self):
+        return [initial for (initial, _, _, _), _ in self.aggregates]
+
+    def _aggregate(self, rows, groups):
+        steps = [(n, step, index) for n, ((_, step, _, _), index) in enumerate(self.aggregates)]
+        get_key = self._get_key
+        for row in rows:
+            key = get_key(row)
+            state = groups.get(key)
+            if state is None:
+                if self.max_groups is not None and len(groups) >= self.max_groups:
+                    return key, row
+                state = groups[key] = self._new_state()
+            for n, step, index in steps:
+                value = None if index is None else row[index]
+                if value is not None or index is None:
+                    state[n] = step(state[n], value)
+        return None
+
+    def _merge(self, partials, groups, max_groups):
+        """Merge (key, state) records into groups. If max_groups is exceeded, stop and return the
+        record which did not fit."""
+        merges = [merge for (_, _, merge, _), _ in self.aggregates]
+        for key, state in partials:
+            current = groups.get(key)
+            if current is not None:
+                groups[key] = [merge(a, b) for merge, a, b in zip(merges, current, state)]
+            elif max_groups is not None and len(groups) >= max_groups:
+                return key, state
+            else:
+                groups[key] = state
+        return None
+
+    def _merge_partitions(self, spill, depth):
+        """Merge spilled partial aggregates one partition at a time, partitioning those with too
+        many groups again"""
+        for partition in spill:
+            partials = iter(partition)
+            groups = {}
+            overflow = self._merge(partials, groups, self.max_groups if depth < self.max_depth else None)
+            if overflow is None:
+                yield from self._results(groups)
+                continue
+
+            respill = SpillPartitions(self.partitions, seed=depth + 1)
+            for key, state in itertools.chain(groups.items(), [overflow], partials):
+                respill.append(key, (key, state))
+            del groups
+            yield from self._merge_partitions(respill, depth + 1)
+
+    def _results(self, groups):
+        results = [result for (_, _, _, result), _ in self.aggregates]
+        for key, state in groups.items():
+            yield list(key) + [value if result is None else result(value) for result, value in zip(results, state)]
+
+    @property
+    def rows(self):
+        rows = iter(self.table.rows)
+        groups = {}
+        overflow = self._aggregate(rows, groups)
+        if overflow is None:
+            if not groups and not self.key_indices:
+                # Aggregates over all rows of an empty table
+                groups[()] = self._new_state()
+            yield from self._results(groups)
+            return
+
+        # Too many groups: spill partial aggregates to disk, partitioned by group
+        spill = SpillPartitions(self.partitions)
+        while overflow is not None:
+            for key, state in groups.items():
+                spill.append(key, (key, state))
+            groups = {}
+            key, row = overflow
+            overflow = self._aggregate(itertools.chain([row], rows), groups)
+
+        for key, state in groups.items():
+            spill.append(key, (key, state))
+        del groups
+
+        yield from self._merge_partitions(spill, depth=0)
+
+
+JOIN_TYPES = ("inner", "left")
+
+
+class JoinedTable(WrappedTable):
+    """
+    Joins a (large, lazy) table with a smaller one. A hash index is built over the rows of the
+    right table once, after which the rows of the left table are streamed through it. Output
+    columns are the columns of the left table, followed by those of the right table except the
+    ones joined on. Like in SQL, None never matches anything.
+
+    >>> table = JoinedTable(articles, projects, on=["project_id"], right_on=["id"], how="left")
+
+    Rows are yielded in the order of the left table. If the right table has more than max_rows
+    rows, both tables are spilled to temporary files partitioned by key (a grace hash join), and
+    partitions are joined one after another. In that case, rows are not yielded in any particular
+    order. Partitions still exceeding max_rows are partitioned again, up to max_depth times.
+    Values must be picklable.
+    """
+    def __init__(self, table: Table, right: Table, on: Sequence[str], right_on: Sequence[str]=None,
+                 how="inner", suffix="_right", max_rows=None, partitions=16, max_depth=3):
+        """
+        @param table: (left) table to wrap
+        @param right: table to build the index over; preferably the smaller one
+        @param on: labels of columns of the left table to join on
+        @param right_on: labels of columns of the right table to join on. Defaults to on.
+        @param how: inner (drop rows of the left table without a match) or left (keep them, with
+                    None for all right columns)
+        @param suffix: appended to labels of right columns which already occur in the left table
+        @param max_rows: maximum number of rows of the right table to keep in memory, or None for
+                         no limit
+        @param partitions: number of temporary files per table to spill to if max_rows is exceeded
+        @param max_depth: maximum number of times to partition partitions exceeding max_rows
+        """
+        super().__init__(table)
+        right_on = on if right_on is None else right_on
+        if how not in JOIN_TYPES:
+            raise ValueError("Unknown join type: {!r}. Choose from: {}".format(how, ", ".join(JOIN_TYPES)))
+        if len(on) != len(right_on):
+            raise ValueError("Number of columns to join on differs: {} != {}".format(len(on), len(right_on)))
+
+        left_columns = list(table.columns)
+        right_columns = list(right.columns)
+        left_indices = {column.label: i for i, column in enumerate(left_columns)}
+        right_indices = {column.label: i for i, column in enumerate(right_columns)}
+
+        self.right = right
+        self.how = how
+        self.max_rows = max_rows
+        self.partitions = partitions
+        self.max_depth = max_depth
+        self.key_indices = [left_indices[label] for label in on]
+        self.right_key_indices = [right_indices[label] for label in right_on]
+        self.value_indices = [i for i in range(len(right_columns)) if i not in self.right_key_indices]
+
+        self.columns = [_output_column(column, column.label, n) for n, column in enumerate(left_columns)]
+        for n, i in enumerate(self.value_indices, start=len(left_columns)):
+            column = right_columns[i]
+            label = column.label + suffix if column.label in left_indices else column.label
+            self.columns.append(_output_column(column, label, n))
+
+        self.size_hint = None
+
+    def _get_key(self, row):
+        return tuple([row[i] for i in self.key_indices])
+
+    def _get_right_record(self, row):
+        """Return (key, values) of a row of the right table"""
+        return tuple([row[i] for i in self.right_key_indices]), [row[i] for i in self.value_indices]
+
+    def _build(self, records, index):
+        """Add (key, values) records to index. If max_rows is exceeded, stop and return the record
+        which did not fit."""
+        size = sum(map(len, index.values()))
+        for key, values in records:
+            if None in key:
+                continue
+            if self.max_rows is not None and size >= self.max_rows:
+                return key, values
+            index.setdefault(key, []).append(values)
+            size += 1
+        return None
+
+    def _probe(self, records, index):
+        """Join (key, row) records of the left table with index"""
+        left = self.how == "left"
+        missing = [[None] * len(self.value_indices)]
+        for key, row in records:
+            matches = index.get(key)
+            if matches is None:
+                if not left:
+                    continue
+                matches = missing
+            for values in matches:
+                yield row + values
+
+    def _join_partitions(self, left, right, depth):
+        """Join spilled partitions of both tables with the same number, repartitioning those of
+        which the right partition is too large to fit in memory"""
+        for left_partition, right_partition in zip(left, right):
+            if depth < self.max_depth and len(right_partition) > self.max_rows:
+                right_spill = SpillPartitions(self.partitions, seed=depth + 1)
+                left_spill = SpillPartitions(self.partitions, seed=depth + 1)
+                for key, values in right_partition:
+                    right_spill.append(key, (key, values))
+                for key, row in left_partition:
+                    left_spill.append(key, (key, row))
+                yield from self._join_partitions(left_spill, right_spill, depth + 1)
+            else:
+                # Fits in memory, or cannot be split further (i.e., many rows with the same key)
+                index = {}
+                for key, values in right_partition:
+                    index.setdefault(key, []).append(values)
+                yield from self._probe(left_partition, index)
+
+    @property
+    def rows(self):
+        get_key = self._get_key
+        right_records = map(self._get_right_record, self.right.rows)
+        index = {}
+        overflow = self._build(right_records, index)
+        if overflow is None:
+            yield from self._probe(((get_key(row), row) for row in self.table.rows), index)
+            return
+
+        # Right table does not fit in memory: spill both tables to disk, partitioned by key
+        right = SpillPartitions(self.partitions)
+        for key, matches in index.items():
+            for values in matches:
+                right.append(key, (key, values))
+        del index
+
+        for key, values in itertools.chain([overflow], right_records):
+            if None not in key:
+                right.append(key, (key, values))
+
+        left = SpillPartitions(self.partitions)
+        for row in self.table.rows:
+            key = get_key(row)
+            if None not in key:
+                left.append(key, (key, row))
+            elif self.how == "left":
+                yield row + [None] * len(self.value_indices)
+
+        yield from self._join_partitions(left, right, depth=0)
+
+
+class DistinctTable(WrappedTable):
+    """
+    Drops rows of which the values of the given columns were seen before, keeping the first.
+
+    >>> table = DistinctTable(articles, on=["id"])
+
+    By default, keys are kept in a set. If more than max_keys keys are found, rows with keys not
+    in that set are spilled to temporary files partitioned by key, and deduplicated one partition
+    after another. In that case, those rows are yielded after all others, in no particular
+    order. Values must be picklable.
+
+    If approximate is True, a Bloom filter of fixed size is used instead. A row is then dropped
+    by mistake with a probability of about error_rate, as long as there are no more than capacity
+    distinct keys. Keys are compared by their pickle (see BloomFilter), so they must be picklable.
+    """
+    def __init__(self, table: Table, on: Sequence[str]=None, approximate=False, capacity=1000000,
+                 error_rate=0.001, max_keys=None, partitions=16):
+        """
+        @param table: table to wrap
+        @param on: labels of columns which identify duplicates. Defaults to all columns.
+        @param approximate: use a Bloom filter instead of an exact set of keys
+        @param capacity: expected number of distinct keys (approximate only)
+        @param error_rate: false positive rate at capacity (approximate only)
+        @param max_keys: maximum number of keys to keep in memory, or None for no limit (exact only)
+        @param partitions: number of temporary files to spill to if max_keys is exceeded
+        """
+        super().__init__(table)
+        columns = list(table.columns)
+        if on is None:
+            self.key_indices = list(range(len(columns)))
+        else:
+            indices = {column.label: i for i, column in enumerate(columns)}
+            self.key_indices = [indices[label] for label in on]
+
+        self.columns = [_output_column(column, column.label, n) for n, column in enumerate(columns)]
+        self.size_hint = None
+        self.approximate = approximate
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_keys = max_keys
+        self.partitions = partitions
+
+    def _get_key(self, row):
+        return tuple([row[i] for i in self.key_indices])
+
+    def _approximate_rows(self):
+        seen = BloomFilter(self.capacity, self.error_rate).add
+        get_key = self._get_key
+        for row in self.table.rows:
+            if not seen(get_key(row)):
+                yield row
+
+    @property
+    def rows(self):
+        if self.approximate:
+            yield from self._approximate_rows()
+            return
+
+        get_key = self._get_key
+        max_keys = self.max_keys
+        seen = set()
+        spill = None
+        for row in self.table.rows:
+            key = get_key(row)
+            if key in seen:
+                continue
+            if max_keys is None or len(seen) < max_keys:
+                seen.add(key)
+                yield row
+            else:
+                # Not seen, but might have been spilled before
+                if spill is None:
+                    spill = SpillPartitions(self.partitions)
+                spill.append(key, (key, row))
+
+        if spill is not None:
+            del seen
+            for partition in spill:
+                seen = set()
+                for key, row in partition:
+                    if key not in seen:
+                        seen.add(key)
+                        yield row
+
+
+class _Prefetcher:
+    """Reads rows in a background thread into a bounded buffer of batches"""
+    def __init__(self, rows, batch_size, buffers):
+        self.queue = queue.Queue(maxsize=buffers)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(iter(rows), batch_size), daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        # Give up when the consumer went away, instead of blocking on a full queue forever
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def _run(self, rows, batch_size):
+        try:
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                if not self._put(batch):
+                    return
+        except BaseException as e:
+            self._put(e)
+        else:
+            self._put(None)
+
+    def close(self):
+        self.stopped.set()
+
+    def __iter__(self):
+        try:
+            while True:
+                batch = self.queue.get()
+                if batch is None:
+                    return
+                if isinstance(batch, BaseException):
+                    raise batch
+                yield from batch
+        finally:
+            self.close()
+
+
+class ConcatTable(WrappedTable):
+    """
+    Presents multiple tables with the same columns (for example, shards of one data source) as
+    a single table. Rows of the next prefetch tables are read in background threads while the
+    rows of the current one are consumed, so the latency of sources overlaps with exporting.
+
+    >>> table = ConcatTable([ListTable(shard, columns) for shard in shards], prefetch=2)
+
+    If key is given, tables are assumed to be sorted by it, and their rows are merged into a
+    single sorted sequence. All tables are then read (and prefetched) at the same time.
+    """
+    def __init__(self, tables: Sequence[Table], key=None, reverse=False, prefetch=1, batch_size=1000, buffers=4):
+        """
+        @param tables: tables to concatenate. Columns must have the same labels.
+        @param key: if given, merge rows of tables sorted by this function (given a row)
+        @param reverse: tables are sorted in descending order (merge only)
+        @param prefetch: number of upcoming tables to read in background threads. If 0, read all
+                         tables in the calling thread.
+        @param batch_size: number of rows passed from a background thread at once
+        @param buffers: maximum number of batches buffered per table
+        """
+        if not tables:
+            raise ValueError("ConcatTable needs at least one table")
+        super().__init__(tables[0])
+
+        columns = list(tables[0].columns)
+        labels = [column.label for column in columns]
+        for table in tables[1:]:
+            other = [column.label for column in table.columns]
+            if other != labels:
+                raise ValueError("Columns of tables differ: {} != {}".format(other, labels))
+
+        self.tables = list(tables)
+        self.columns = [_output_column(column, column.label, n) for n, column in enumerate(columns)]
+        self.key = key
+        self.reverse = reverse
+        self.prefetch = prefetch
+        self.batch_size = batch_size
+        self.buffers = buffers
+
+        hints = [table.size_hint for table in self.tables]
+        self.size_hint = None if None in hints else sum(hints)
+
+    def _read(self, table):
+        return _Prefetcher(table.rows, self.batch_size, self.buffers)
+
+    def _concat(self):
+        tables = iter(self.tables)
+        pending = collections.deque(self._read(table) for table in itertools.islice(tables, self.prefetch + 1))
+        try:
+            while pending:
+                rows = pending.popleft()
+                yield from rows
+                pending.extend(self._read(table) for table in itertools.islice(tables, 1))
+        finally:
+            for rows in pending:
+                rows.close()
+
+    @property
+    def rows(self):
+        if self.key is not None:
+            read = self._read if self.prefetch else (lambda table: table.rows)
+            return heapq.merge(*map(read, self.tables), key=self.key, reverse=self.reverse)
+        if not self.prefetch:
+            return itertools.chain.from_iterable(table.rows for table in self.tables)
+        return self._concat()
+
+
+class Workbook:
+    """
+    A workbook groups several tables, which are exported as separate sheets of a single file by
+    spreadsheet exporters (XLSX, ODS, XLS). Tables are exported one after another, so lazy tables
+    are consumed one at a time.
+
+    >>> workbook = Workbook({"Articles": articles_table, "Projects": projects_table})
+    >>> workbook.dump(open("export.xlsx", "wb"), "xlsx")
+    """
+    def __init__(self, sheets: Mapping[str, Table]):
+        """
+        @param sheets: mapping of sheet names to tables. Sheets are written in iteration order.
+        """
+        self.sheets = collections.OrderedDict(sheets)
+
+    def _get_exporter(self, exporter):
+        exporter = get_exporter(exporter)()
+        exporter.check_supported(self)
+        return exporter
+
+    def dump(self, fo, exporter, filename_hint=None, encoding_hint="utf-8"):
+        return self._get_exporter(exporter).dump(self, fo, filename_hint=filename_hint, encoding_hint=encoding_hint)
+
+    def dumps(self, exporter, filename_hint=None, encoding_hint="utf-8"):
+        return self._get_exporter(exporter).dumps(self, filename_hint=filename_hint, encoding_hint=encoding_hint)
+
+
 def _get_declared_columns(cls):
     for attr_name in dir(cls):
         if not attr_name.startswith("_"):
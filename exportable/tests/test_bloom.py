@@ -0,0 +1,56 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import unittest
+
+from exportable.bloom import BloomFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_membership(self):
+        bloom = BloomFilter(10000, error_rate=0.01)
+        self.assertLess(sum(bloom.add(i) for i in range(10000)), 10000 * 0.01)
+        self.assertTrue(all(i in bloom for i in range(10000)))
+        self.assertTrue(bloom.add(5))
+
+    def test_error_rate(self):
+        bloom = BloomFilter(10000, error_rate=0.01)
+        for i in range(10000):
+            bloom.add("value {}".format(i))
+        false_positives = sum("other {}".format(i) in bloom for i in range(10000))
+        self.assertLess(false_positives, 10000 * 0.02)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, BloomFilter, 100, error_rate=0)
+
+    def test_equal_hashes(self):
+        """Values with equal hash() should not collide"""
+        self.assertEqual(hash(-1), hash(-2))
+        bloom = BloomFilter(100)
+        bloom.add((-1,))
+        self.assertNotIn((-2,), bloom)
+
+    def test_equal_keys(self):
+        """Equal tuples should be present, even if they hold different (but equal) objects"""
+        s = "".join(["a", "b"])
+        bloom = BloomFilter(100)
+        bloom.add((s, s))
+        bloom.add((1, (s, s)))
+        self.assertIn(("".join(["a", "b"]), "".join(["a", "b"])), bloom)
+        self.assertIn((1, ("".join(["a", "b"]), "".join(["a", "b"]))), bloom)
+        self.assertNotIn((s,), bloom)
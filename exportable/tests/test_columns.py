@@ -0,0 +1,124 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import copy
+import datetime
+import pickle
+import unittest
+import uuid
+
+import dateutil.parser
+
+from exportable.columns import DateTimeColumn, DateColumn, DateTimeParser, IntColumn, FloatColumn, TextColumn, UUIDColumn, BooleanField
+
+
+class TestDateTimeParser(unittest.TestCase):
+    values = [
+        "2020-09-08T12:11:10",
+        "2020-09-08 12:11:10.123",
+        "2020-09-08T12:11:10+02:00",
+        "2020-09-08",
+        "2020/09/08 12:11:10",
+        "09/08/2020",
+        "08-SEP-2020-12:11:10",
+        "Sep 8 2020 12:11",
+        "8 September 2020",
+    ]
+
+    def test_dateutil_compatible(self):
+        """Fast paths should yield the same values dateutil would"""
+        parser = DateTimeParser()
+        for value in self.values + self.values[::-1]:
+            self.assertEqual(dateutil.parser.parse(value), parser.parse(value), value)
+
+    def test_learn(self):
+        parser = DateTimeParser()
+        parser.parse("09/08/2020")
+        learned = parser.learned
+        parser.parse("09/09/2020")
+        self.assertIs(learned, parser.learned)
+        parser.parse("2020-09-08")
+        self.assertEqual(datetime.datetime.fromisoformat, parser.learned)
+
+    def test_cache(self):
+        column = copy.copy(DateTimeColumn(cache_size=10))
+        self.assertEqual(datetime.datetime(2020, 9, 8), column.from_str("2020-09-08"))
+        self.assertEqual(datetime.datetime(2020, 9, 8), column.from_str("2020-09-08"))
+        self.assertEqual(["2020-09-08"], list(column.parser.cache))
+        self.assertIsNone(column.from_str(""))
+
+        for i in range(1, 20):
+            column.from_str("2020-09-{:02}".format(i))
+        self.assertEqual(10, len(column.parser.cache))
+
+    def test_cache_copy(self):
+        """Copies of columns should not share caches, and should be picklable"""
+        column = DateTimeColumn(cache_size=10)
+        column.from_str("2020-09-08")
+        copied = copy.copy(column)
+        self.assertIsNot(column.parser, copied.parser)
+        self.assertEqual(0, len(copied.parser.cache))
+        self.assertEqual(10, copied.parser.cache_size)
+
+        unpickled = pickle.loads(pickle.dumps(DateColumn("a", cache_size=10)))
+        self.assertEqual(datetime.date(2020, 9, 8), unpickled.from_str("2020-09-08"))
+
+    def test_date_column(self):
+        column = DateColumn()
+        self.assertEqual(datetime.date(2020, 9, 8), column.from_str("2020-09-08"))
+        self.assertEqual(datetime.date(2020, 9, 8), column.from_str("Sep 8 2020"))
+
+
+class TestToStrMany(unittest.TestCase):
+    def assertToStrMany(self, column, values):
+        expected = [None if value is None else column.to_str(value) for value in values]
+        self.assertEqual(expected, column.to_str_many(values))
+
+    def test_to_str_many(self):
+        self.assertToStrMany(IntColumn(), [1, None, -2**70])
+        self.assertToStrMany(FloatColumn(), [1.5, None, 1e16, float("nan")])
+        self.assertToStrMany(TextColumn(), ["a", None, ""])
+        self.assertToStrMany(UUIDColumn(), [uuid.uuid4(), None])
+        self.assertToStrMany(BooleanField(), [True, None, False])
+        self.assertToStrMany(DateColumn(), [datetime.date(2020, 1, 2), None, datetime.date(2020, 1, 2), datetime.date(2010, 1, 2)])
+        self.assertToStrMany(DateTimeColumn(), [datetime.datetime(2020, 1, 2, 3, 4, 5, 6), None, datetime.datetime(2020, 1, 2)])
+
+        # Dates are accepted as well, like to_str() does
+        self.assertToStrMany(DateTimeColumn(), [datetime.date(2020, 1, 2), datetime.datetime(2020, 1, 2, 3)])
+
+    def test_subclass(self):
+        """Specialized implementations should respect overridden to_str()"""
+        class UpperColumn(TextColumn):
+            def to_str(self, value):
+                return value.upper()
+
+        class DayColumn(DateTimeColumn):
+            def to_str(self, value):
+                return value.strftime("%A")
+
+        self.assertEqual(UpperColumn().to_str_many(["a", None]), ["A", None])
+        self.assertEqual(DayColumn().to_str_many([datetime.datetime(2020, 9, 8)]), ["Tuesday"])
+
+    def test_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            raise unittest.SkipTest("numpy not installed")
+
+        self.assertEqual(IntColumn().to_str_many(numpy.array([1, 2, 3])), ["1", "2", "3"])
+        self.assertEqual(FloatColumn().to_str_many(numpy.array([1.5, 0.1, 1e16])), ["1.5", "0.1", "1e+16"])
@@ -0,0 +1,82 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import unittest
+from operator import itemgetter
+
+from exportable.columns import IntColumn, TextColumn
+from exportable.compiler import get_row_getter, get_row_converter, get_row_formatter, row_getter_factory
+from exportable.table import ListTable
+
+
+class TestCompiler(unittest.TestCase):
+    def test_row_getter(self):
+        get_row = get_row_getter(((itemgetter(1), None), (itemgetter(0), str)))
+        self.assertEqual(get_row([1, 2]), [2, "1"])
+        self.assertEqual(get_row_getter(())([1]), [])
+
+    def test_row_converter(self):
+        convert = get_row_converter((None, str))
+        self.assertEqual(convert([1, 2]), [1, "2"])
+        self.assertEqual(convert([None, None]), [None, None])
+        self.assertEqual(get_row_converter(())([]), [])
+
+        convert = get_row_converter((None, str), ("a", 'quote"d'))
+        self.assertEqual(convert([1, 2]), {"a": 1, 'quote"d': "2"})
+
+    def test_row_formatter(self):
+        format_row = get_row_formatter((str, None), "\t")
+        self.assertEqual(format_row([1, "a"]), "1\ta\n")
+        self.assertEqual(format_row([None, None]), "\t\n")
+        self.assertEqual(get_row_formatter((), ",", "")([]), "")
+
+    def test_cached(self):
+        """Code should be shared by schemas of the same shape, without keeping their functions"""
+        self.assertIs(get_row_converter((None, str)).__code__, get_row_converter([None, repr]).__code__)
+        self.assertIsNot(get_row_converter((None, str)).__code__, get_row_converter((str, None)).__code__)
+
+        row_getter_factory.cache_clear()
+        for _ in range(3):
+            list(ListTable([[1, 2]], [IntColumn("a"), IntColumn("b")]).rows)
+        self.assertEqual(1, row_getter_factory.cache_info().misses)
+        self.assertEqual(2, row_getter_factory.cache_info().hits)
+
+    def test_unhashable(self):
+        """Functions do not need to be hashable"""
+        class Double(object):
+            __hash__ = None
+
+            def __eq__(self, other):
+                return isinstance(other, Double)
+
+            def __call__(self, value):
+                return 2 * value
+
+        table = ListTable([[1, 2]], [IntColumn("a", cellfunc=Double()), IntColumn("b")])
+        self.assertEqual([[2, 2]], list(table.rows))
+        self.assertEqual([2, 2], get_row_converter((Double(), None))([1, 2]))
+
+    def test_table_rows(self):
+        """Tables overriding get_value should not use generated getters"""
+        class DoubleTable(ListTable):
+            def get_value(self, row, column):
+                return 2 * super().get_value(row, column)
+
+        columns = [IntColumn("a"), TextColumn("b", cellfunc=str.upper)]
+        self.assertEqual(list(ListTable([[1, "a"]], columns).rows), [[1, "A"]])
+        self.assertEqual(list(DoubleTable([[1, "a"]], columns).rows), [[2, "AA"]])
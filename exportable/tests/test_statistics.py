@@ -0,0 +1,85 @@
+###########################################################################
+#          (C) Vrije Universiteit, Amsterdam (the Netherlands)            #
+#                                                                         #
+# This file is part of AmCAT - The Amsterdam Content Analysis Toolkit     #
+#                                                                         #
+# AmCAT is free software: you can redistribute it and/or modify it under  #
+# the terms of the GNU Affero General Public License as published by the  #
+# Free Software Foundation, either version 3 of the License, or (at your  #
+# option) any later version.                                              #
+#                                                                         #
+# AmCAT is distributed in the hope that it will be useful, but WITHOUT    #
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or   #
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public     #
+# License for more details.                                               #
+#                                                                         #
+# You should have received a copy of the GNU Affero General Public        #
+# License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
+###########################################################################
+import datetime
+import unittest
+
+from exportable.columns import IntColumn, TextColumn, DateTimeColumn
+from exportable.exporters import CSVExporter
+from exportable.statistics import HyperLogLog, StatisticsTable
+from exportable.table import ListTable, SortedTable
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_estimate(self):
+        for n in (0, 1, 100, 10000, 100000):
+            hll = HyperLogLog()
+            hll.add_many(range(n))
+            hll.add_many(range(n))
+            self.assertAlmostEqual(len(hll), n, delta=n * 0.05)
+
+    def test_strings(self):
+        hll = HyperLogLog(precision=14)
+        hll.add_many("value {}".format(i) for i in range(50000))
+        self.assertAlmostEqual(len(hll), 50000, delta=50000 * 0.03)
+
+
+class TestStatisticsTable(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            [1, "abc", datetime.datetime(2020, 1, 2)],
+            [None, "♝♝", None],
+            [3, None, datetime.datetime(2010, 1, 2)],
+            [1, "abc", None],
+        ]
+        self.columns = [IntColumn("a"), TextColumn("b"), DateTimeColumn("c")]
+
+    def test_statistics(self):
+        table = StatisticsTable(ListTable(self.rows, self.columns), batch_size=3)
+        self.assertEqual(self.rows, list(table.rows))
+
+        a, b, c = table.column_statistics
+        self.assertEqual((a.count, a.nulls, a.min, a.max, a.distinct), (4, 1, 1, 3, 2))
+        self.assertEqual((b.nulls, b.min, b.max, b.distinct, b.max_length), (1, "abc", "♝♝", 2, 6))
+        self.assertEqual((c.nulls, c.min, c.max), (2, datetime.datetime(2010, 1, 2), datetime.datetime(2020, 1, 2)))
+        self.assertIsNone(a.max_length)
+        self.assertIs(table.statistics["b"], b)
+
+    def test_export(self):
+        """Statistics are collected while exporting, through both the table and exporter API"""
+        table = StatisticsTable(ListTable(self.rows, self.columns))
+        expected = CSVExporter().dumps(ListTable(self.rows, self.columns))
+        self.assertEqual(expected, table.dumps("csv"))
+        self.assertEqual(table.statistics["a"].count, 4)
+
+        table = StatisticsTable(ListTable(self.rows, self.columns))
+        self.assertEqual(expected, b"".join(CSVExporter().dump_iter(table)))
+        self.assertEqual(table.statistics["a"].count, 4)
+
+    def test_wrapped(self):
+        table = StatisticsTable(SortedTable(ListTable(self.rows, self.columns, lazy=False), key=lambda row: row[1] or ""))
+        table.dumps("csv")
+        self.assertEqual(table.statistics["b"].min, "abc")
+
+    def test_unorderable(self):
+        table = StatisticsTable(ListTable([[1], ["a"], [[1]]], [IntColumn("a")]))
+        list(table.rows)
+        stats = table.statistics["a"]
+        self.assertFalse(stats.orderable)
+        self.assertIsNone(stats.min)
+        self.assertIsNone(stats.distinct)
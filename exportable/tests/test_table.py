@@ -17,10 +17,14 @@
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
 import datetime
+import gc
 import unittest
+from operator import itemgetter
+from unittest import mock
 
 from exportable.columns import IntColumn, TextColumn, DateTimeColumn, FloatColumn
-from exportable.table import ListTable, DeclaredTable
+from exportable.spill import SpillPartitions
+from exportable.table import ListTable, DeclaredTable, GroupedTable, JoinedTable, DistinctTable, ConcatTable, _Prefetcher
 
 
 class TestListTable(unittest.TestCase):
@@ -129,3 +133,256 @@ class TestDeclaredTable(unittest.TestCase):
         self.assertRaises(ValueError, SumDT, ListTable, exclude=[], include=[], rows=[])
         self.assertRaises(ValueError, SumDT, ListTable, exclude=["a1"], include=["a2"], rows=[])
 
+
+class TestGroupedTable(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            ["a", 1, 2.0, datetime.datetime(2020, 1, 2)],
+            ["b", 2, None, None],
+            ["a", 3, 4.0, datetime.datetime(2010, 1, 2)],
+            ["c", None, None, None],
+        ]
+        self.columns = [TextColumn("medium"), IntColumn("x"), FloatColumn("y"), DateTimeColumn("date")]
+        self.aggregates = [
+            ("n", "count", None),
+            ("nx", "count", "x"),
+            ("sum", "sum", "x"),
+            ("min", "min", "date"),
+            ("max", "max", "y"),
+            ("mean", "mean", "y"),
+        ]
+
+    def group(self, rows, **kwargs):
+        return GroupedTable(ListTable(rows, self.columns), by=["medium"], aggregates=self.aggregates, **kwargs)
+
+    def test_aggregates(self):
+        table = self.group(self.rows)
+        self.assertEqual(list(table.rows), [
+            ["a", 2, 2, 4, datetime.datetime(2010, 1, 2), 4.0, 3.0],
+            ["b", 1, 1, 2, None, None, None],
+            ["c", 1, 0, None, None, None, None],
+        ])
+
+    def test_columns(self):
+        table = self.group(self.rows)
+        self.assertEqual([c.label for c in table.columns], ["medium", "n", "nx", "sum", "min", "max", "mean"])
+        self.assertEqual([c.type for c in table.columns], [str, int, int, int, datetime.datetime, float, float])
+        self.assertIsNone(table.size_hint)
+        self.assertEqual(table.dumps("csv").splitlines()[1], b"a,2,2,4,2010-01-02T00:00:00,4.0,3.0")
+
+    def test_multiple_keys(self):
+        table = GroupedTable(ListTable(self.rows, self.columns), by=["medium", "x"], aggregates=[("n", "count", None)])
+        self.assertEqual(len(list(table.rows)), 4)
+
+    def test_spill(self):
+        expected = sorted(self.group(self.rows * 10).rows)
+        self.assertEqual(sorted(self.group(self.rows * 10, max_groups=1, partitions=2).rows), expected)
+
+        rows = [["m{}".format(i % 100), i, float(i), None] for i in range(1000)]
+        expected = sorted(self.group(rows).rows)
+        self.assertEqual(sorted(self.group(rows, max_groups=10).rows), expected)
+
+    def test_repartition(self):
+        """Partitions with more than max_groups groups should be partitioned again"""
+        rows = [["m{}".format(i % 200), i, float(i), None] for i in range(1000)]
+        expected = sorted(self.group(rows).rows)
+        with mock.patch("exportable.table.SpillPartitions", wraps=SpillPartitions) as spill:
+            self.assertEqual(sorted(self.group(rows, max_groups=10, partitions=2).rows), expected)
+        self.assertIn(mock.call(2, seed=1), spill.call_args_list)
+
+        # Without max_depth, partitions are merged in memory regardless
+        self.assertEqual(sorted(self.group(rows, max_groups=10, partitions=2, max_depth=0).rows), expected)
+
+    def test_empty(self):
+        table = GroupedTable(ListTable([], self.columns), by=[], aggregates=self.aggregates)
+        self.assertEqual(list(table.rows), [[0, 0, None, None, None, None]])
+        self.assertEqual(list(self.group([]).rows), [])
+
+    def test_invalid(self):
+        table = ListTable(self.rows, self.columns)
+        self.assertRaises(ValueError, GroupedTable, table, ["medium"], [("s", "median", "x")])
+        self.assertRaises(ValueError, GroupedTable, table, ["medium"], [("s", "sum", None)])
+
+
+class TestJoinedTable(unittest.TestCase):
+    def setUp(self):
+        self.articles = [[1, "a"], [2, "b"], [3, "a"], [4, None], [5, "x"]]
+        self.media = [["a", "Paper", 1], ["b", "TV", 2], ["b", "Radio", 3], [None, "None", 4]]
+
+    def join(self, articles, media, **kwargs):
+        left = ListTable(articles, [IntColumn("id"), TextColumn("medium")])
+        right = ListTable(media, [TextColumn("medium"), TextColumn("name"), IntColumn("id")])
+        return JoinedTable(left, right, on=["medium"], **kwargs)
+
+    def test_inner(self):
+        table = self.join(self.articles, self.media)
+        self.assertEqual(list(table.rows), [
+            [1, "a", "Paper", 1],
+            [2, "b", "TV", 2],
+            [2, "b", "Radio", 3],
+            [3, "a", "Paper", 1],
+        ])
+
+    def test_left(self):
+        table = self.join(self.articles, self.media, how="left")
+        rows = list(table.rows)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[-2:], [[4, None, None, None], [5, "x", None, None]])
+
+    def test_columns(self):
+        table = self.join(self.articles, self.media)
+        self.assertEqual([c.label for c in table.columns], ["id", "medium", "name", "id_right"])
+        self.assertEqual([c.type for c in table.columns], [int, str, str, int])
+        self.assertEqual(table.dumps("csv").splitlines()[1], b"1,a,Paper,1")
+
+    def test_verbose_names(self):
+        """Renamed columns should keep verbose names set by the user"""
+        left = ListTable(self.articles, [IntColumn("id", verbose_name="Article"), TextColumn("medium")])
+        right = ListTable(self.media, [TextColumn("medium"), TextColumn("name"), IntColumn("id", verbose_name="Medium")])
+        table = JoinedTable(left, right, on=["medium"])
+        self.assertEqual([c.label for c in table.columns], ["id", "medium", "name", "id_right"])
+        self.assertEqual([c.verbose_name for c in table.columns], ["Article", "medium", "name", "Medium"])
+
+        right = ListTable(self.media, [TextColumn("medium"), TextColumn("name"), IntColumn("id")])
+        table = JoinedTable(left, right, on=["medium"])
+        self.assertEqual(table.columns[-1].verbose_name, "id_right")
+
+    def test_right_on(self):
+        left = ListTable(self.articles, [IntColumn("id"), TextColumn("medium")])
+        right = ListTable(self.media, [TextColumn("code"), TextColumn("name"), IntColumn("n")])
+        table = JoinedTable(left, right, on=["medium"], right_on=["code"])
+        self.assertEqual([c.label for c in table.columns], ["id", "medium", "name", "n"])
+        self.assertEqual(len(list(table.rows)), 4)
+
+    def test_spill(self):
+        for how in ("inner", "left"):
+            expected = sorted(self.join(self.articles, self.media, how=how).rows, key=str)
+            spilled = self.join(self.articles, self.media, how=how, max_rows=1, partitions=2)
+            self.assertEqual(sorted(spilled.rows, key=str), expected)
+
+        articles = [[i, "m{}".format(i % 150)] for i in range(1000)]
+        media = [["m{}".format(i), str(i), i] for i in range(100)]
+        expected = sorted(self.join(articles, media, how="left").rows, key=str)
+        spilled = self.join(articles, media, how="left", max_rows=5, partitions=4)
+        self.assertEqual(sorted(spilled.rows, key=str), expected)
+
+    def test_invalid(self):
+        left = ListTable(self.articles, [IntColumn("id"), TextColumn("medium")])
+        self.assertRaises(ValueError, JoinedTable, left, left, on=["medium"], how="outer")
+        self.assertRaises(ValueError, JoinedTable, left, left, on=["medium"], right_on=["id", "medium"])
+
+
+class TestDistinctTable(unittest.TestCase):
+    def setUp(self):
+        self.columns = [IntColumn("id"), TextColumn("medium")]
+        self.rows = [[1, "a"], [2, "b"], [1, "a"], [3, "a"], [2, "c"], [None, "a"], [None, "a"]]
+
+    def test_all_columns(self):
+        table = DistinctTable(ListTable(self.rows, self.columns))
+        self.assertEqual(list(table.rows), [[1, "a"], [2, "b"], [3, "a"], [2, "c"], [None, "a"]])
+        self.assertEqual([c.label for c in table.columns], ["id", "medium"])
+
+    def test_on(self):
+        table = DistinctTable(ListTable(self.rows, self.columns), on=["id"])
+        self.assertEqual(list(table.rows), [[1, "a"], [2, "b"], [3, "a"], [None, "a"]])
+        table = DistinctTable(ListTable(self.rows, self.columns), on=["medium"])
+        self.assertEqual(table.dumps("csv").splitlines()[1:], [b"1,a", b"2,b", b"2,c"])
+
+    def test_spill(self):
+        table = DistinctTable(ListTable(self.rows, self.columns), max_keys=1, partitions=2)
+        self.assertEqual(list(table.rows)[0], [1, "a"])
+        table = DistinctTable(ListTable(self.rows, self.columns), max_keys=1, partitions=2)
+        self.assertEqual(sorted(table.rows, key=str), sorted(DistinctTable(ListTable(self.rows, self.columns)).rows, key=str))
+
+        rows = [[i % 300, "x"] for i in range(3000)]
+        table = DistinctTable(ListTable(rows, self.columns), max_keys=100, partitions=4)
+        self.assertEqual(sorted(table.rows), [[i, "x"] for i in range(300)])
+
+    def test_approximate(self):
+        table = DistinctTable(ListTable(self.rows, self.columns), on=["id"], approximate=True, capacity=100)
+        self.assertEqual(list(table.rows), [[1, "a"], [2, "b"], [3, "a"], [None, "a"]])
+
+        rows = [[-1, "a"], [-2, "b"], [3, "c"]]
+        table = DistinctTable(ListTable(rows, self.columns), on=["id"], approximate=True, capacity=100)
+        self.assertEqual(list(table.rows), rows)
+
+        # Equal keys, holding the same string twice or two equal strings
+        s = "".join(["a", "b"])
+        rows = [[s, s], ["".join(["a", "b"]), "".join(["a", "b"])], ["ab", "ab"]]
+        table = DistinctTable(ListTable(rows, [TextColumn("a"), TextColumn("b")]), approximate=True, capacity=100)
+        self.assertEqual(list(table.rows), [["ab", "ab"]])
+
+        rows = [[i % 5000, "x"] for i in range(20000)]
+        table = DistinctTable(ListTable(rows, self.columns), approximate=True, capacity=5000, error_rate=0.01)
+        self.assertAlmostEqual(len(list(table.rows)), 5000, delta=5000 * 0.02)
+
+
+class TestConcatTable(unittest.TestCase):
+    def setUp(self):
+        self.columns = [IntColumn("id"), TextColumn("medium")]
+        self.shards = [
+            [[1, "a"], [4, "b"], [5, "a"]],
+            [],
+            [[2, "c"], [3, "a"], [6, "d"]],
+        ]
+
+    def concat(self, lazy=True, **kwargs):
+        return ConcatTable([ListTable(shard, self.columns, lazy=lazy) for shard in self.shards], **kwargs)
+
+    def test_concat(self):
+        expected = [row for shard in self.shards for row in shard]
+        for prefetch in (0, 1, 5):
+            self.assertEqual(list(self.concat(prefetch=prefetch, batch_size=2, buffers=1).rows), expected)
+        self.assertEqual(self.concat().dumps("csv").splitlines()[1:3], [b"1,a", b"4,b"])
+
+    def test_merge(self):
+        expected = [[i, m] for i, m in sorted(row for shard in self.shards for row in shard)]
+        for prefetch in (0, 1):
+            table = self.concat(key=itemgetter(0), prefetch=prefetch, batch_size=1)
+            self.assertEqual(list(table.rows), expected)
+
+        self.shards = [list(reversed(shard)) for shard in self.shards]
+        table = self.concat(key=itemgetter(0), reverse=True)
+        self.assertEqual(list(table.rows), list(reversed(expected)))
+
+    def test_size_hint(self):
+        self.assertEqual(self.concat().size_hint, 6)
+        table = ConcatTable([ListTable(iter(shard), self.columns) for shard in self.shards])
+        self.assertIsNone(table.size_hint)
+
+    def test_errors(self):
+        def failing():
+            yield [1, "a"]
+            raise KeyError("shard went away")
+
+        table = ConcatTable([ListTable(failing(), self.columns), ListTable([[2, "b"]], self.columns)])
+        self.assertRaises(KeyError, list, table.rows)
+        self.assertRaises(ValueError, ConcatTable, [])
+        self.assertRaises(ValueError, ConcatTable, [ListTable([], self.columns), ListTable([], [IntColumn("x")])])
+
+    def test_close(self):
+        """Background threads should stop when the consumer closes or abandons the rows"""
+        rows = [[i, "x"] for i in range(10000)]
+        for key in (None, itemgetter(0)):
+            for abandon in (False, True):
+                prefetchers = []
+
+                def prefetch(*args):
+                    prefetchers.append(_Prefetcher(*args))
+                    return prefetchers[-1]
+
+                with mock.patch("exportable.table._Prefetcher", side_effect=prefetch):
+                    tables = [ListTable(rows, self.columns) for _ in range(3)]
+                    iterator = iter(ConcatTable(tables, key=key, prefetch=2, batch_size=10, buffers=1).rows)
+                    self.assertEqual(next(iterator), [0, "x"])
+                    self.assertEqual(len(prefetchers), 3)
+
+                    if abandon:
+                        del iterator
+                        gc.collect()
+                    else:
+                        iterator.close()
+
+                for prefetcher in prefetchers:
+                    prefetcher.thread.join(timeout=5)
+                    self.assertFalse(prefetcher.thread.is_alive())
@@ -11,7 +11,9 @@ setup(
     packages=[
         'exportable',
         'exportable.exporters',
-        'exportable.exporters.tests'
+        'exportable.exporters.tests',
+        'exportable.importers',
+        'exportable.importers.tests'
     ],
     package_data={
         '*': ['LICENSE.txt', 'requirements.txt'],